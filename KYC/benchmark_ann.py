@@ -0,0 +1,93 @@
+import argparse
+import json
+import time
+import numpy as np
+
+from src.ann_index import ExactIndex, IVFIndex
+from src.gallery import l2_normalize
+
+# --- KONFIGURASI DEFAULT ---
+DIM = 512
+N_GALLERY = 200000
+N_QUERIES = 200
+TOP_K = 10
+NPROBES = [1, 2, 4, 8, 16, 32, 64]
+
+def synthetic_gallery(n, dim, n_identities, seed=0):
+    """Galeri sintetis: beberapa embedding per identitas di sekitar pusat acak (mirip data wajah)."""
+    rng = np.random.default_rng(seed)
+    centers = l2_normalize(rng.standard_normal((n_identities, dim)).astype(np.float32))
+    owner = rng.integers(0, n_identities, n)
+    vectors = centers[owner] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+    return l2_normalize(vectors), centers
+
+def time_queries(index, queries, vectors, top_k, **kwargs):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        idx, _ = index.search(q, vectors, top_k, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(idx)
+    return results, np.array(latencies)
+
+def recall_at(approx, exact, k):
+    hits = [len(set(a[:k].tolist()) & set(e[:k].tolist())) / min(k, len(e)) for a, e in zip(approx, exact)]
+    return float(np.mean(hits))
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan recall vs latency IVF terhadap exact scan.")
+    parser.add_argument("--n", type=int, default=N_GALLERY, help="Jumlah embedding galeri sintetis.")
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--nlist", type=int, default=None, help="Jumlah list IVF (default sqrt(N)).")
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    print(f"Membuat galeri sintetis: {args.n} x {DIM}...")
+    vectors, centers = synthetic_gallery(args.n, DIM, n_identities=max(1, args.n // 5))
+    rng = np.random.default_rng(1)
+    queries = l2_normalize(centers[rng.integers(0, len(centers), args.queries)]
+                           + 0.35 * rng.standard_normal((args.queries, DIM)).astype(np.float32) / np.sqrt(DIM))
+
+    exact = ExactIndex()
+    exact.build(vectors)
+    exact_results, exact_lat = time_queries(exact, queries, vectors, args.top_k)
+
+    ivf = IVFIndex(nlist=args.nlist, min_train_size=1)
+    start = time.perf_counter()
+    ivf.build(vectors)
+    build_s = time.perf_counter() - start
+    print(f"IVF build: nlist={len(ivf.lists)}, {build_s:.2f}s")
+
+    report = {
+        "n": args.n, "dim": DIM, "top_k": args.top_k, "nlist": len(ivf.lists), "build_s": build_s,
+        "exact": {"p50_ms": float(np.percentile(exact_lat, 50)), "p95_ms": float(np.percentile(exact_lat, 95))},
+        "ivf": [],
+    }
+
+    print(f"\n{'index':<12}{'recall@1':>10}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>10}")
+    print(f"{'exact':<12}{1.0:>10.3f}{1.0:>10.3f}{report['exact']['p50_ms']:>10.2f}{report['exact']['p95_ms']:>10.2f}{1.0:>10.1f}")
+
+    for nprobe in NPROBES:
+        if nprobe > len(ivf.lists):
+            break
+        results, lat = time_queries(ivf, queries, vectors, args.top_k, nprobe=nprobe)
+        row = {
+            "nprobe": nprobe,
+            "recall@1": recall_at(results, exact_results, 1),
+            f"recall@{args.top_k}": recall_at(results, exact_results, args.top_k),
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p95_ms": float(np.percentile(lat, 95)),
+        }
+        row["speedup"] = report["exact"]["p50_ms"] / max(row["p50_ms"], 1e-9)
+        report["ivf"].append(row)
+        print(f"{'ivf/' + str(nprobe):<12}{row['recall@1']:>10.3f}{row[f'recall@{args.top_k}']:>10.3f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['speedup']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nHasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
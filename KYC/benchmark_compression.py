@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+from src.embedding_store import EmbeddingStore
+from src.gallery import GalleryCache, l2_normalize
+
+# --- KONFIGURASI DEFAULT ---
+DIM = 512
+N_GALLERY = 200000
+N_QUERIES = 200
+TOP_K = 10
+# (codec, rerank) -- rerank=0 berarti hanya coarse scan di atas kode terkompresi
+MODES = [("float32", 0), ("float16", 0), ("float16", 32), ("int8", 0), ("int8", 32), ("int8", 128)]
+
+def synthetic_gallery(n, dim, n_identities, seed=0):
+    """Galeri sintetis: beberapa embedding per identitas di sekitar pusat acak (mirip data wajah)."""
+    rng = np.random.default_rng(seed)
+    centers = l2_normalize(rng.standard_normal((n_identities, dim)).astype(np.float32))
+    owner = rng.integers(0, n_identities, n)
+    vectors = centers[owner] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+    return vectors, centers
+
+def reference_top_k(vectors, queries, top_k):
+    """Hasil float32 saat ini: cosine_similarity(query, galeri) lalu urutkan."""
+    normed = l2_normalize(vectors)
+    results = []
+    for q in queries:
+        scores = normed @ q
+        idx = np.argpartition(-scores, top_k - 1)[:top_k]
+        results.append(idx[np.argsort(-scores[idx])])
+    return results
+
+def agreement(results, reference, k):
+    return float(np.mean([len(set(r[:k].tolist()) & set(e[:k].tolist())) / k for r, e in zip(results, reference)]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Memori & kecocokan galeri float16/int8 (+ re-rank) vs float32.")
+    parser.add_argument("--n", type=int, default=N_GALLERY)
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    print(f"Membuat galeri sintetis: {args.n} x {DIM}...")
+    vectors, centers = synthetic_gallery(args.n, DIM, n_identities=max(1, args.n // 5))
+    rng = np.random.default_rng(1)
+    queries = l2_normalize(centers[rng.integers(0, len(centers), args.queries)]
+                           + 0.35 * rng.standard_normal((args.queries, DIM)).astype(np.float32) / np.sqrt(DIM))
+    reference = reference_top_k(vectors, queries, args.top_k)
+
+    report = {"n": args.n, "dim": DIM, "top_k": args.top_k, "modes": []}
+    with tempfile.TemporaryDirectory() as workdir:
+        store = EmbeddingStore(os.path.join(workdir, "e.bin"), os.path.join(workdir, "e_index.csv"))
+        store.append_many([str(i) for i in range(args.n)], ["SYNTHETIC"] * args.n, vectors)
+        del vectors
+
+        print(f"\n{'codec':<10}{'rerank':>8}{'MB':>10}{'top-1':>9}{f'top-{args.top_k}':>9}{'p50 ms':>10}{'p95 ms':>10}")
+        for codec, rerank in MODES:
+            gallery = GalleryCache(store, compression=codec, rerank=rerank)
+            results, latencies = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                idx = gallery.search(q, args.top_k)[0]
+                latencies.append((time.perf_counter() - t0) * 1000)
+                results.append(idx)
+
+            row = {
+                "codec": codec, "rerank": rerank,
+                "resident_mb": gallery.nbytes / 1e6,
+                "top1_agreement": agreement(results, reference, 1),
+                f"top{args.top_k}_agreement": agreement(results, reference, args.top_k),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+            }
+            report["modes"].append(row)
+            print(f"{codec:<10}{rerank:>8}{row['resident_mb']:>10.1f}{row['top1_agreement']:>9.3f}"
+                  f"{row[f'top{args.top_k}_agreement']:>9.3f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+            del gallery
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nHasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
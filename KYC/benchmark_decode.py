@@ -0,0 +1,108 @@
+import argparse
+import glob
+import io
+import json
+import multiprocessing as mp
+import resource
+import time
+import numpy as np
+from PIL import Image
+
+from src.image_decode import decode_image, FACE_MAX_SIDE, OCR_MAX_SIDE
+
+# --- KONFIGURASI DEFAULT ---
+FILE_PATTERNS = ["dataset/face/**/*.jpg", "dataset/id_data/*.jpg"]
+SYNTHETIC_SIZE = (4000, 3000)  # ~12 MP, ukuran foto HP
+
+# Jalur lama: Image.open(full res) -> convert('RGB') di engine (+ tobytes untuk key cache),
+# OCR menambah np.array(...). Jalur baru: satu decode_image per konsumen.
+def legacy_face(raw: bytes):
+    image = Image.open(io.BytesIO(raw)).convert('RGB')
+    image.tobytes()
+    return image.size
+
+def legacy_ocr(raw: bytes):
+    image = Image.open(io.BytesIO(raw))
+    image.convert('RGB').tobytes()
+    return np.array(image.convert('RGB')).shape[1::-1]
+
+def shared_face(raw: bytes):
+    array, _ = decode_image(raw, FACE_MAX_SIDE)
+    return array.shape[1::-1]
+
+def shared_ocr(raw: bytes):
+    array, _ = decode_image(raw, OCR_MAX_SIDE)
+    return array.shape[1::-1]
+
+MODES = {"legacy_face": legacy_face, "shared_face": shared_face, "legacy_ocr": legacy_ocr, "shared_ocr": shared_ocr}
+
+def load_inputs(limit: int, synthetic: bool) -> list:
+    files = []
+    for pattern in FILE_PATTERNS:
+        files += sorted(glob.glob(pattern, recursive=True))
+    if files and not synthetic:
+        return [open(f, 'rb').read() for f in files[:limit]]
+
+    # Tanpa dataset (atau --synthetic): satu JPEG sintetis 12 MP (gradien + noise agar tidak terlalu mudah dikompres)
+    w, h = SYNTHETIC_SIZE
+    rng = np.random.default_rng(0)
+    base = np.linspace(0, 255, w, dtype=np.float32)[None, :, None].repeat(h, 0).repeat(3, 2)
+    pixels = np.clip(base + rng.normal(0, 12, (h, w, 3)), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return [buf.getvalue()]
+
+def run_mode(mode: str, inputs: list, repeat: int, conn):
+    # Dijalankan di proses anak agar peak RSS (ru_maxrss) terukur per mode
+    fn = MODES[mode]
+    before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    latencies, size = [], None
+    for _ in range(repeat):
+        for raw in inputs:
+            t0 = time.perf_counter()
+            size = fn(raw)
+            latencies.append((time.perf_counter() - t0) * 1000)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before_kb
+    conn.send({
+        "latency_mean_ms": float(np.mean(latencies)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "peak_rss_growth_mb": peak_kb / 1024.0,
+        "output_size": list(size),
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Waktu decode & peak memori: decode full-res lama vs decode_image.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-images", type=int, default=50)
+    parser.add_argument("--synthetic", action="store_true", help="Pakai JPEG sintetis 12 MP (seperti selfie HP).")
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    inputs = load_inputs(args.max_images, args.synthetic)
+    print(f"Inputs: {len(inputs)} image(s), repeat={args.repeat}, face max side={FACE_MAX_SIDE}, OCR max side={OCR_MAX_SIDE}")
+
+    ctx = mp.get_context("fork")
+    report = {}
+    for mode in MODES:
+        recv, send = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=run_mode, args=(mode, inputs, args.repeat, send))
+        proc.start()
+        report[mode] = recv.recv()
+        proc.join()
+
+    print(f"\n{'mode':<14}{'mean ms':>10}{'p95 ms':>10}{'peak MB':>10}   output")
+    for mode, r in report.items():
+        print(f"{mode:<14}{r['latency_mean_ms']:>10.1f}{r['latency_p95_ms']:>10.1f}{r['peak_rss_growth_mb']:>10.1f}   {r['output_size']}")
+
+    for consumer in ("face", "ocr"):
+        old, new = report[f"legacy_{consumer}"], report[f"shared_{consumer}"]
+        print(f"{consumer}: decode {old['latency_mean_ms'] / max(new['latency_mean_ms'], 1e-9):.1f}x faster, "
+              f"peak memory {old['peak_rss_growth_mb']:.1f} MB -> {new['peak_rss_growth_mb']:.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nHasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import glob
+import time
+import numpy as np
+import torch
+from PIL import Image
+
+from src.face_engine import FaceEngine
+
+# --- KONFIGURASI ---
+DATASET_PATTERN = "dataset/face/**/*.jpg"
+MAX_IMAGES = 30
+
+def main():
+    files = sorted(glob.glob(DATASET_PATTERN, recursive=True))[:MAX_IMAGES]
+    if not files:
+        print(f"Error: Tidak ada gambar di {DATASET_PATTERN}")
+        return
+
+    images = [Image.open(f).convert('RGB') for f in files]
+    engine = FaceEngine()
+
+    two_pass, single_pass, embed = [], [], []
+
+    for img in images:
+        # Jalur lama: detect() untuk bbox lalu mtcnn() untuk crop (cascade 2x)
+        t0 = time.perf_counter()
+        engine.mtcnn.detect(img)
+        engine.mtcnn(img, return_prob=True)
+        two_pass.append((time.perf_counter() - t0) * 1000)
+
+        # Jalur baru: satu kali cascade
+        t0 = time.perf_counter()
+        crop, _, _ = engine.detect_face(img)
+        single_pass.append((time.perf_counter() - t0) * 1000)
+
+        if crop is not None:
+            t0 = time.perf_counter()
+            with torch.no_grad():
+                engine.model(crop.unsqueeze(0))
+            embed.append((time.perf_counter() - t0) * 1000)
+
+    print(f"\n--- Per-stage timing ({len(images)} images, ms) ---")
+    print(f"{'stage':<28}{'mean':>10}{'p50':>10}{'p95':>10}")
+    for name, values in [("detect+crop (2 pass, old)", two_pass),
+                         ("detect+crop (1 pass, new)", single_pass),
+                         ("embedding", embed)]:
+        if values:
+            v = np.array(values)
+            print(f"{name:<28}{v.mean():>10.1f}{np.percentile(v, 50):>10.1f}{np.percentile(v, 95):>10.1f}")
+
+    print(f"\nDetection speedup: {np.mean(two_pass) / np.mean(single_pass):.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import glob
+import json
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from src.pipeline import KYCPipeline
+from src.batcher import MicroBatcher
+
+# --- KONFIGURASI DEFAULT ---
+DATASET_PATTERN = "dataset/face/**/*.jpg"
+
+def run_load(call, images, n_requests, concurrency):
+    """Kirim n_requests secara konkuren, kembalikan (throughput req/s, latensi ms per request)."""
+    latencies = []
+
+    def one(i):
+        t0 = time.perf_counter()
+        call(images[i % len(images)])
+        return (time.perf_counter() - t0) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    return n_requests / elapsed, np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput & p99 /kyc-check dengan micro-batching on vs off.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(DATASET_PATTERN, recursive=True))[:64]
+    if not files:
+        print(f"Error: Tidak ada gambar di {DATASET_PATTERN}")
+        return
+    images = [Image.open(f).convert('RGB') for f in files]
+
+    # Cache hasil dimatikan: dengan <= 64 gambar yang diulang, semua request setelah putaran
+    # pertama akan menjadi cache hit dan benchmark tidak lagi mengukur inferensi
+    pipeline = KYCPipeline(cache_size=0)
+    batcher = MicroBatcher(pipeline.kyc_match_batch, args.max_batch, args.max_wait_ms)
+
+    report = []
+    print(f"\n{'mode':<8}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'avg batch':>11}")
+    for concurrency in args.concurrency:
+        for mode in ["off", "on"]:
+            if mode == "off":
+                call = pipeline.kyc_match
+            else:
+                batcher.batches = batcher.items = 0
+                call = lambda img: batcher.submit(img).result()
+
+            throughput, lat = run_load(call, images, args.requests, concurrency)
+            row = {
+                "mode": mode, "concurrency": concurrency, "throughput_rps": throughput,
+                "p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99)),
+                "avg_batch_size": batcher.stats()["avg_batch_size"] if mode == "on" else 1.0,
+            }
+            report.append(row)
+            print(f"{mode:<8}{concurrency:>6}{throughput:>10.2f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['avg_batch_size']:>11.1f}")
+
+    batcher.stop()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nHasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
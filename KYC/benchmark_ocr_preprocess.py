@@ -0,0 +1,81 @@
+import argparse
+import glob
+import json
+import time
+import numpy as np
+from PIL import Image
+
+from src.ocr_engine import OCREngine
+from src.id_parser import IDParser
+from src.card_detector import normalize_card
+
+# --- KONFIGURASI DEFAULT ---
+DATASET_PATTERNS = ["dataset/id_data/*.jpg", "dataset/id_data/*.png"]
+FIELDS = ["id_number", "full_name", "dob"]
+
+# (nama mode, preprocess, field_regions)
+MODES = [("full_image", False, False), ("card", True, False), ("card_regions", True, True)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency & akurasi parsing OCR dengan/ tanpa normalisasi kartu.")
+    parser.add_argument("--repeat", type=int, default=1, help="Ulangi OCR per gambar untuk latency stabil.")
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    files = sorted(f for pattern in DATASET_PATTERNS for f in glob.glob(pattern))
+    if not files:
+        print(f"Error: Tidak ada gambar di {', '.join(DATASET_PATTERNS)}")
+        return
+
+    engine = OCREngine()
+    id_parser = IDParser()
+    report = {"files": files, "modes": {}}
+    baseline = {}
+
+    for mode, preprocess, field_regions in MODES:
+        engine.preprocess, engine.field_regions = preprocess, field_regions
+        latencies, parsed = [], {}
+
+        for f in files:
+            image = Image.open(f)
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                data = id_parser.parse_data(engine.extract_text(image))
+                latencies.append((time.perf_counter() - t0) * 1000)
+            parsed[f] = {k: data.get(k) for k in FIELDS}
+
+        if mode == "full_image":
+            baseline = parsed
+
+        agreement = np.mean([parsed[f][k] == baseline[f][k] for f in files for k in FIELDS])
+        report["modes"][mode] = {
+            "latency_mean_ms": float(np.mean(latencies)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "field_agreement_vs_full": float(agreement),
+            "ids_found": sum(1 for f in files if parsed[f]["id_number"]),
+            "parsed": parsed,
+        }
+
+    # Info lokalisasi: apakah kartu ditemukan dan berapa piksel yang di-OCR
+    report["localisation"] = {}
+    for f in files:
+        image_np = np.array(Image.open(f).convert('RGB'))
+        card, found = normalize_card(image_np)
+        report["localisation"][f] = {"found": found, "input_px": int(image_np.shape[0] * image_np.shape[1]),
+                                     "ocr_px": int(card.shape[0] * card.shape[1])}
+
+    print(f"\n{'mode':<14}{'mean ms':>10}{'p95 ms':>10}{'IDs found':>11}{'agree vs full':>15}")
+    for mode, row in report["modes"].items():
+        print(f"{mode:<14}{row['latency_mean_ms']:>10.0f}{row['latency_p95_ms']:>10.0f}"
+              f"{row['ids_found']:>8}/{len(files):<2}{row['field_agreement_vs_full']:>15.2f}")
+
+    for f, loc in report["localisation"].items():
+        print(f"{f}: card found={loc['found']}, {loc['input_px'] / 1e6:.1f} MP -> {loc['ocr_px'] / 1e6:.2f} MP")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nHasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
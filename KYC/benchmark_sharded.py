@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+from src.embedding_store import EmbeddingStore
+from src.gallery import GalleryCache, l2_normalize
+from src.sharded_search import ShardedSearcher
+
+# --- KONFIGURASI DEFAULT ---
+DIM = 512
+N_GALLERY = 500000
+N_QUERIES = 64
+BATCH_SIZE = 16  # sama dengan MAX_BATCH_SIZE micro-batching di main.py
+TOP_K = 1
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+def run(search_batch, queries, batch_size):
+    """Mengembalikan (hasil per query, latency per batch ms, throughput query/s)."""
+    results, latencies = [], []
+    start = time.perf_counter()
+    for s in range(0, len(queries), batch_size):
+        t0 = time.perf_counter()
+        results += search_batch(queries[s:s + batch_size])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    return results, np.array(latencies), len(queries) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput exact scan ter-shard vs jumlah core.")
+    parser.add_argument("--n", type=int, default=N_GALLERY)
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--segment-rows", type=int, default=65536)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = l2_normalize(rng.standard_normal((args.queries, DIM)).astype(np.float32))
+    report = {"n": args.n, "dim": DIM, "batch_size": args.batch_size, "cpu_count": os.cpu_count(), "runs": []}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = EmbeddingStore(os.path.join(workdir, "e.bin"), os.path.join(workdir, "e_index.csv"))
+        print(f"Membuat galeri sintetis: {args.n} x {DIM}...")
+        for s in range(0, args.n, 50000):
+            n = min(50000, args.n - s)
+            store.append_many([str(s + i) for i in range(n)], ["SYNTHETIC"] * n,
+                              rng.standard_normal((n, DIM)).astype(np.float32))
+
+        # Baseline: scan satu proses seperti kyc_match saat ini (GalleryCache.search_batch)
+        gallery = GalleryCache(store)
+        baseline, lat, qps = run(lambda q: gallery.search_batch(q, TOP_K), queries, args.batch_size)
+        report["runs"].append({"mode": "single_process", "workers": 1, "qps": qps,
+                               "batch_p50_ms": float(np.percentile(lat, 50))})
+        del gallery
+
+        print(f"\n{'mode':<16}{'workers':>8}{'query/s':>10}{'batch p50 ms':>14}{'speedup':>9}{'identical':>11}")
+        print(f"{'single_process':<16}{1:>8}{qps:>10.1f}{np.percentile(lat, 50):>14.1f}{1.0:>9.2f}{'-':>11}")
+
+        for workers in worker_counts(args.max_workers):
+            searcher = ShardedSearcher(store.MATRIX_FILE, DIM, workers=workers, segment_rows=args.segment_rows)
+            searcher.search(queries[:1], TOP_K, args.n)  # isi cache norm di worker
+            results, lat, w_qps = run(lambda q: searcher.search(q, TOP_K, args.n), queries, args.batch_size)
+            searcher.shutdown()
+
+            identical = all(np.array_equal(r[0], b[0]) for r, b in zip(results, baseline))
+            report["runs"].append({"mode": "sharded", "workers": workers, "qps": w_qps,
+                                   "batch_p50_ms": float(np.percentile(lat, 50)), "identical_top_k": identical})
+            print(f"{'sharded':<16}{workers:>8}{w_qps:>10.1f}{np.percentile(lat, 50):>14.1f}"
+                  f"{w_qps / qps:>9.2f}{str(identical):>11}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nHasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
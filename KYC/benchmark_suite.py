@@ -0,0 +1,277 @@
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import numpy as np
+import torch
+from PIL import Image
+
+from src.ann_index import create_index
+from src.embedding_store import EmbeddingStore
+from src.gallery import GalleryCache, l2_normalize
+from src.id_parser import IDParser
+from src.record_store import OCRRecordStore
+
+# --- KONFIGURASI DEFAULT ---
+FACE_PATTERNS = ["dataset/face/**/*.jpg", "dataset/face/**/*.png"]
+ID_PATTERNS = ["dataset/id_data/*.jpg", "dataset/id_data/*.png"]
+GALLERY_SIZES = [1000, 10000, 100000, 1000000]
+OUTPUT_DIR = "bench_results"
+DIM = 512
+
+# Bobot pretrained harus sudah ada di cache lokal (benchmark berjalan offline)
+FACENET_WEIGHTS = os.path.join(torch.hub.get_dir(), "checkpoints", "20180402-114759-vggface2.pt")
+EASYOCR_DIR = os.path.join(os.path.expanduser("~"), ".EasyOCR", "model")
+
+
+def summarize(latencies_ms) -> dict:
+    v = np.asarray(latencies_ms, dtype=np.float64)
+    if v.size == 0:
+        return {"n": 0}
+    return {
+        "n": int(v.size),
+        "mean_ms": float(v.mean()),
+        "p50_ms": float(np.percentile(v, 50)),
+        "p95_ms": float(np.percentile(v, 95)),
+        "p99_ms": float(np.percentile(v, 99)),
+        "throughput_per_s": float(1000.0 / v.mean()) if v.mean() > 0 else 0.0,
+    }
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def load_bytes(patterns: list, limit: int, synthetic_shape: tuple) -> list:
+    """Bytes gambar (JPEG/PNG) dari dataset lokal; jika tidak ada, gambar sintetis."""
+    files = sorted(f for pattern in patterns for f in glob.glob(pattern, recursive=True))[:limit]
+    if files:
+        return [open(f, 'rb').read() for f in files]
+
+    rng = np.random.default_rng(0)
+    out = []
+    for _ in range(min(limit, 8)):
+        buf = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, synthetic_shape, dtype=np.uint8)).save(buf, format="JPEG")
+        out.append(buf.getvalue())
+    return out
+
+
+# --- STAGE BENCHMARKS ---
+def bench_face(face_bytes: list, repeat: int, quantization: str) -> dict:
+    from src.face_engine import FaceEngine
+
+    engine = FaceEngine(quantization=quantization)
+    stages = {"image_decode": [], "mtcnn_detect": [], "embedding": []}
+
+    if quantization == "fx_static":
+        engine.quantize_model([Image.open(io.BytesIO(b)).convert('RGB') for b in face_bytes[:32]])
+
+    for _ in range(repeat):
+        for raw in face_bytes:
+            image, ms = timed(lambda b: Image.open(io.BytesIO(b)).convert('RGB'), raw)
+            stages["image_decode"].append(ms)
+
+            (crop, _, _), ms = timed(engine.detect_face, image)
+            stages["mtcnn_detect"].append(ms)
+            if crop is None:
+                continue
+
+            with torch.no_grad():
+                _, ms = timed(engine.model, crop.unsqueeze(0))
+            stages["embedding"].append(ms)
+
+    return {k: summarize(v) for k, v in stages.items()}
+
+
+def bench_ocr(id_bytes: list, repeat: int) -> dict:
+    from src.ocr_engine import OCREngine
+
+    engine = OCREngine()
+    parser = IDParser()
+    stages = {"ocr": [], "parsing": []}
+
+    for _ in range(repeat):
+        for raw in id_bytes:
+            image = Image.open(io.BytesIO(raw)).convert('RGB')
+            blocks, ms = timed(engine.extract_text, image)
+            stages["ocr"].append(ms)
+            _, ms = timed(parser.parse_data, blocks)
+            stages["parsing"].append(ms)
+
+    return {k: summarize(v) for k, v in stages.items()}
+
+
+def bench_db_writes(workdir: str, n: int = 500) -> dict:
+    records = OCRRecordStore(os.path.join(workdir, "records.db"))
+    store = EmbeddingStore(os.path.join(workdir, "w.bin"), os.path.join(workdir, "w_index.csv"))
+    vector = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+
+    ocr_writes, emb_writes = [], []
+    for i in range(n):
+        data = {"id_number": f"{i:08d}X", "id_valid": False, "full_name": "BENCH USER", "dob": "01-01-1990"}
+        _, ms = timed(records.insert, data["id_number"], data)
+        ocr_writes.append(ms)
+        _, ms = timed(store.append, data["id_number"], data["full_name"], vector)
+        emb_writes.append(ms)
+
+    lookups = [timed(records.get, f"{i:08d}X")[1] for i in range(n)]
+    return {"db_write_ocr": summarize(ocr_writes), "db_write_embedding": summarize(emb_writes),
+            "db_lookup_ocr": summarize(lookups)}
+
+
+def bench_gallery(workdir: str, sizes: list, n_queries: int, index_kind: str) -> list:
+    rng = np.random.default_rng(0)
+    results = []
+
+    for size in sizes:
+        path = os.path.join(workdir, f"gallery_{size}")
+        store = EmbeddingStore(path + ".bin", path + "_index.csv")
+
+        # Tulis galeri sintetis per chunk agar memori tetap rendah
+        for start in range(0, size, 50000):
+            n = min(50000, size - start)
+            vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+            store.append_many([str(start + i) for i in range(n)], ["SYNTHETIC"] * n, vectors)
+
+        def load_gallery():
+            gallery = GalleryCache(store, index=create_index(index_kind, min_train_size=1))
+            gallery.wait_for_index()  # IVF dibangun di background; ukur sampai index siap
+            return gallery
+
+        gallery, load_ms = timed(load_gallery)
+        queries = l2_normalize(rng.standard_normal((n_queries, DIM)).astype(np.float32))
+        search_ms = [timed(gallery.search, q, 1)[1] for q in queries]
+        # Verifikasi 1:1: hanya embedding milik satu ID (tidak tergantung ukuran galeri)
+        claimed = rng.integers(0, size, n_queries)
+        verify_ms = [timed(gallery.score_identity, q, str(c))[1] for q, c in zip(queries, claimed)]
+
+        row = {"gallery_size": size, "index": index_kind, "gallery_load_ms": load_ms,
+               "similarity_search": summarize(search_ms),
+               "verify_1to1": summarize(verify_ms),
+               "resident_mb": gallery.matrix.nbytes / 1e6}
+        results.append(row)
+        print(f"[Bench] gallery={size:>8} load={load_ms:>9.1f}ms search p50={row['similarity_search']['p50_ms']:.2f}ms "
+              f"p99={row['similarity_search']['p99_ms']:.2f}ms verify 1:1 p50={row['verify_1to1']['p50_ms']:.3f}ms")
+
+        del gallery
+        os.remove(path + ".bin")
+        os.remove(path + "_index.csv")
+
+    return results
+
+
+def check_offline(need_face: bool, need_ocr: bool) -> bool:
+    ok = True
+    if need_face and not os.path.exists(FACENET_WEIGHTS):
+        print(f"[Bench] ⚠️ FaceNet weights not cached at {FACENET_WEIGHTS}. Run the server once online first.")
+        ok = False
+    if need_ocr and not glob.glob(os.path.join(EASYOCR_DIR, "*.pth")):
+        print(f"[Bench] ⚠️ EasyOCR models not cached in {EASYOCR_DIR}. Run the server once online first.")
+        ok = False
+    return ok
+
+
+def compare(old_path: str, new_path: str):
+    """Bandingkan dua file hasil (mis. dua commit) per stage pada p50/p95."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{'stage':<22}{'old p50':>10}{'new p50':>10}{'Δ p50':>9}{'old p95':>10}{'new p95':>10}{'Δ p95':>9}")
+    for stage, stats in new["stages"].items():
+        before = old["stages"].get(stage)
+        if not before or not before.get("n") or not stats.get("n"):
+            continue
+        d50 = (stats["p50_ms"] / before["p50_ms"] - 1) * 100
+        d95 = (stats["p95_ms"] / before["p95_ms"] - 1) * 100
+        print(f"{stage:<22}{before['p50_ms']:>10.2f}{stats['p50_ms']:>10.2f}{d50:>8.1f}%"
+              f"{before['p95_ms']:>10.2f}{stats['p95_ms']:>10.2f}{d95:>8.1f}%")
+
+    old_sweep = {row["gallery_size"]: row for row in old.get("gallery_sweep", [])}
+    for row in new.get("gallery_sweep", []):
+        before = old_sweep.get(row["gallery_size"])
+        if not before:
+            continue
+        b, a = before["similarity_search"], row["similarity_search"]
+        stage = f"search@{row['gallery_size']}"
+        print(f"{stage:<22}{b['p50_ms']:>10.2f}{a['p50_ms']:>10.2f}{(a['p50_ms'] / b['p50_ms'] - 1) * 100:>8.1f}%"
+              f"{b['p95_ms']:>10.2f}{a['p95_ms']:>10.2f}{(a['p95_ms'] / b['p95_ms'] - 1) * 100:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latency & scaling per stage KYCPipeline.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-images", type=int, default=32)
+    parser.add_argument("--gallery-sizes", type=int, nargs="+", default=GALLERY_SIZES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--index", default="exact", choices=["exact", "ivf"])
+    parser.add_argument("--quantization", default="none", choices=["none", "dynamic", "fx_static"])
+    parser.add_argument("--skip-face", action="store_true")
+    parser.add_argument("--skip-ocr", action="store_true")
+    parser.add_argument("--output", default=None, help=f"Default: {OUTPUT_DIR}/<commit>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Bandingkan dua file hasil.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if not check_offline(not args.skip_face, not args.skip_ocr):
+        return
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "quantization": args.quantization,
+        },
+        "stages": {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if not args.skip_face:
+            face_bytes = load_bytes(FACE_PATTERNS, args.max_images, (480, 640, 3))
+            report["stages"].update(bench_face(face_bytes, args.repeat, args.quantization))
+
+        if not args.skip_ocr:
+            id_bytes = load_bytes(ID_PATTERNS, args.max_images, (630, 1000, 3))
+            report["stages"].update(bench_ocr(id_bytes, args.repeat))
+
+        report["stages"].update(bench_db_writes(workdir))
+        report["gallery_sweep"] = bench_gallery(workdir, args.gallery_sizes, args.queries, args.index)
+
+    print(f"\n{'stage':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}")
+    for stage, s in report["stages"].items():
+        if s.get("n"):
+            print(f"{stage:<22}{s['n']:>6}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['throughput_per_s']:>10.1f}")
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"\nHasil disimpan ke {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from src.database import Database
+from src.face_engine import FaceEngine
+from src.pipeline import FACE_MODEL_ARTIFACT, calibration_files, calibration_fingerprint
+
+# --- KONFIGURASI DEFAULT ---
+CHECKPOINT_FILE = "data/enroll_checkpoint.jsonl"
+EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+def load_mapping(path: str) -> dict:
+    """CSV dua kolom: nama folder / nama file (tanpa ekstensi) -> ID Number."""
+    mapping = {}
+    with open(path, 'r', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[0].strip():
+                mapping[row[0].strip()] = row[1].strip().upper()
+    return mapping
+
+def resolve_id(path: str, root: str, mapping: dict, id_regex):
+    """
+    Urutan: mapping nama file -> mapping folder -> regex nama file -> nama folder sebagai ID.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    folder = os.path.relpath(os.path.dirname(path), root).split(os.sep)[0]
+
+    if stem in mapping:
+        return mapping[stem]
+    if folder in mapping:
+        return mapping[folder]
+    if id_regex:
+        match = id_regex.search(stem)
+        return match.group(1).upper() if match else None
+    if mapping:
+        return None
+    return folder.upper() if folder != "." else None
+
+def load_checkpoint(path: str) -> set:
+    done = set()
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["file"])
+                except (ValueError, KeyError):
+                    continue  # baris terakhir terpotong saat crash
+    return done
+
+def decode(path: str):
+    try:
+        with Image.open(path) as img:
+            return img.convert('RGB')
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk enrollment wajah dari folder (batched, resumable).")
+    parser.add_argument("input_dir", help="Folder foto, mis. dataset/face (satu subfolder per orang).")
+    parser.add_argument("--mapping", default=None, help="CSV: nama folder/file -> ID Number.")
+    parser.add_argument("--id-regex", default=None, help="Regex dengan satu grup untuk mengambil ID dari nama file.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--decode-workers", type=int, default=4)
+    parser.add_argument("--quantization", default="none", choices=["none", "dynamic", "fx_static"],
+                        help="Harus sama dengan QUANTIZATION_MODE di main.py. Mode selain 'none' memakai "
+                             f"artefak model milik server ({FACE_MODEL_ARTIFACT}); jalankan server sekali dulu.")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    args = parser.parse_args()
+
+    mapping = load_mapping(args.mapping) if args.mapping else {}
+    id_regex = re.compile(args.id_regex) if args.id_regex else None
+
+    files = []
+    for folder, _, names in os.walk(args.input_dir):
+        files.extend(os.path.join(folder, n) for n in names if n.lower().endswith(EXTENSIONS))
+    files.sort()
+
+    done = load_checkpoint(args.checkpoint)
+    pending = [f for f in files if f not in done]
+    print(f"[Enroll] {len(files)} files, {len(files) - len(pending)} already done, {len(pending)} to process.")
+    if not pending:
+        return
+
+    engine = FaceEngine(quantization=args.quantization)
+    # Embedding galeri harus berasal dari model yang sama persis dengan server: pakai artefak
+    # hasil kalibrasi server, bukan kalibrasi ulang dari batch enrollment
+    if args.quantization != "none":
+        fingerprint = calibration_fingerprint(engine, calibration_files())
+        if not engine.load_model_artifact(FACE_MODEL_ARTIFACT, fingerprint):
+            print(f"Error: Artefak model '{args.quantization}' server tidak ditemukan / kedaluwarsa di "
+                  f"{FACE_MODEL_ARTIFACT}. Jalankan server dengan QUANTIZATION_MODE yang sama terlebih dahulu.")
+            sys.exit(1)
+
+    db = Database()
+    user_cache = {}
+
+    stats = {"success": 0, "no_face": 0, "unregistered": 0, "unmapped": 0, "decode_error": 0}
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(args.checkpoint) or ".", exist_ok=True)
+
+    with open(args.checkpoint, 'a') as checkpoint, ThreadPoolExecutor(max_workers=args.decode_workers) as pool:
+        for batch_start in range(0, len(pending), args.batch_size):
+            batch_files = pending[batch_start:batch_start + args.batch_size]
+            entries, to_embed = [], []
+
+            # Decode paralel (PIL melepas GIL saat decode JPEG)
+            for path, image in zip(batch_files, pool.map(decode, batch_files)):
+                id_number = resolve_id(path, args.input_dir, mapping, id_regex)
+                entry = {"file": path, "id_number": id_number}
+
+                if id_number is None:
+                    entry["status"] = "unmapped"
+                elif image is None:
+                    entry["status"] = "decode_error"
+                else:
+                    if id_number not in user_cache:
+                        user_cache[id_number] = db.get_user_by_id(id_number)
+                    if not user_cache[id_number]:
+                        entry["status"] = "unregistered"
+                    else:
+                        to_embed.append((entry, image))
+                entries.append(entry)
+
+            ids, names, vectors = [], [], []
+            if to_embed:
+                results = engine.extract_embeddings_batch([img for _, img in to_embed], args.batch_size)
+                for (entry, _), result in zip(to_embed, results):
+                    if not result["found"]:
+                        entry["status"] = "no_face"
+                        continue
+                    entry["status"] = "success"
+                    ids.append(entry["id_number"])
+                    names.append(user_cache[entry["id_number"]].get("full_name", "Unknown"))
+                    vectors.append(result["embedding"])
+
+            # Commit embedding dulu, baru checkpoint (crash -> batch diulang, bukan hilang)
+            if vectors:
+                db.save_embeddings(ids, names, np.vstack(vectors))
+
+            checkpoint.write("".join(json.dumps(e) + "\n" for e in entries))
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+
+            for e in entries:
+                stats[e["status"]] += 1
+            processed = batch_start + len(batch_files)
+            rate = processed / (time.perf_counter() - start)
+            print(f"[Enroll] {processed}/{len(pending)} files ({rate:.2f} img/s) {stats}")
+
+    print(f"\n✅ Enrollment selesai: {stats['success']} embeddings disimpan dalam {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import glob
+import numpy as np
+import torch
+from PIL import Image
+
+from src.face_engine import FaceEngine
+from src.model_runtime import EXPORT_DIR, EMBEDDING_NET, MTCNN_NETS, export_models, load_module
+
+# --- KONFIGURASI DEFAULT ---
+DATASET_PATTERN = "dataset/face/**/*.jpg"
+MAX_IMAGES = 32
+TOLERANCE = 1e-3  # Maks selisih absolut embedding (L2-normalized) terhadap eager
+
+def sample_inputs(engine):
+    """Crop wajah asli dari dataset (fallback: tensor acak) untuk cek kesetaraan."""
+    crops = []
+    for f in sorted(glob.glob(DATASET_PATTERN, recursive=True))[:MAX_IMAGES]:
+        crop, _, _ = engine.detect_face(Image.open(f).convert('RGB'))
+        if crop is not None:
+            crops.append(crop)
+
+    if not crops:
+        return torch.randn(8, 3, 160, 160)
+    return torch.stack(crops)
+
+def verify(engine, export_dir, runtime):
+    exported = load_module(export_dir, EMBEDDING_NET, runtime)
+    if exported is None:
+        print(f"[Verify] {runtime}: artifact/runtime not available, skipped.")
+        return True
+
+    inputs = sample_inputs(engine)
+    with torch.no_grad():
+        ref = engine.model(inputs).numpy()
+        out = exported(inputs).numpy()
+
+    max_abs = float(np.abs(ref - out).max())
+    cos = np.sum(ref * out, axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(out, axis=1))
+    ok = max_abs <= TOLERANCE
+    print(f"[Verify] {runtime:<12} {EMBEDDING_NET}: max|diff|={max_abs:.2e}, min cos={cos.min():.6f} -> {'OK' if ok else 'FAIL'}")
+
+    for name, shape in MTCNN_NETS.items():
+        net = load_module(export_dir, name, runtime)
+        if net is None:
+            continue
+        x = torch.rand(*shape)
+        with torch.no_grad():
+            ref_out = getattr(engine.mtcnn, name)(x)
+            exp_out = net(x)
+        diff = max(float((a - b).abs().max()) for a, b in zip(ref_out, exp_out))
+        stage_ok = diff <= TOLERANCE
+        ok = ok and stage_ok
+        print(f"[Verify] {runtime:<12} {name}: max|diff|={diff:.2e} -> {'OK' if stage_ok else 'FAIL'}")
+
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Export model wajah ke TorchScript/ONNX + cek kesetaraan dengan eager.")
+    parser.add_argument("--output", default=EXPORT_DIR, help="Folder artefak.")
+    parser.add_argument("--formats", nargs="+", default=["torchscript", "onnx"], choices=["torchscript", "onnx"])
+    parser.add_argument("--no-mtcnn", action="store_true", help="Hanya export InceptionResnetV1.")
+    args = parser.parse_args()
+
+    # Selalu export dari model eager Float32
+    engine = FaceEngine(quantization="none")
+    paths = export_models(engine, args.output, args.formats, include_mtcnn=not args.no_mtcnn)
+    for p in paths:
+        print(f"[Export] {p}")
+
+    ok = all([verify(engine, args.output, runtime) for runtime in args.formats])
+    if not ok:
+        raise SystemExit("❌ Exported model does not match eager model within tolerance.")
+    print("✅ Export selesai dan setara dengan model eager.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import torch
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+
+from src.database import Database
+from src.id_parser import IDParser
+from src.ocr_engine import OCREngine
+
+# --- KONFIGURASI DEFAULT ---
+MANIFEST_FILE = "data/ingest_manifest.jsonl"
+# Status manifest yang diulang saat resume (bukan hasil akhir file tersebut)
+RETRY_STATUSES = ("db_error",)
+EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# --- STATE WORKER (satu EasyOCR reader per proses) ---
+_ocr_engine = None
+_id_parser = None
+
+def _init_worker(threads: int, preprocess: bool, field_regions: bool):
+    global _ocr_engine, _id_parser
+    # Batasi thread torch per worker agar proses tidak saling berebut core
+    torch.set_num_threads(threads)
+    # Region field hanya ada pada kartu yang sudah dinormalisasi
+    _ocr_engine = OCREngine(preprocess=preprocess or field_regions, field_regions=field_regions)
+    _id_parser = IDParser()
+
+def _process_file(path: str) -> dict:
+    t0 = time.perf_counter()
+    try:
+        raw_data = _ocr_engine.extract_text(Image.open(path))
+        data = _id_parser.parse_data(raw_data)
+        error = None
+    except Exception as e:
+        data, error = None, str(e)
+    return {"file": path, "data": data, "error": error, "ms": (time.perf_counter() - t0) * 1000}
+
+def list_images(root: str) -> list:
+    files = []
+    for folder, _, names in os.walk(root):
+        files.extend(os.path.join(folder, n) for n in names if n.lower().endswith(EXTENSIONS))
+    return sorted(files)
+
+def load_manifest(path: str) -> set:
+    """File yang sudah selesai tidak diproses ulang saat resume, kecuali status di RETRY_STATUSES."""
+    done = set()
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if entry.get("status") not in RETRY_STATUSES:
+                        done.add(entry["file"])
+                except (ValueError, KeyError):
+                    continue  # baris terakhir terpotong saat crash
+    return done
+
+def commit(db: Database, buffer: list, manifest) -> list:
+    """Tulis satu batch ke database, baru kemudian catat di manifest."""
+    to_save = [r for r in buffer if r["data"] and r["data"].get("id_number")]
+    try:
+        saved = iter(db.save_ocr_results([r["data"] for r in to_save])) if to_save else iter([])
+        db_error = None
+    except Exception as e:
+        # Batch tidak tersimpan: dicatat sebagai db_error sehingga diulang saat resume
+        db_error = f"Gagal menyimpan data ke database: {str(e)}"
+
+    entries = []
+    for r in buffer:
+        entry = {"file": r["file"], "ms": round(r["ms"], 1), "id_number": None}
+        if r["error"]:
+            entry.update(status="error", message=r["error"])
+        elif not (r["data"] and r["data"].get("id_number")):
+            entry.update(status="failed", message="Gagal membaca Nomer ID (DNI) atau format tidak ditemukan.")
+        elif db_error:
+            entry.update(status="db_error", message=db_error, id_number=r["data"]["id_number"])
+        else:
+            success, msg = next(saved)
+            entry.update(status="success" if success else "duplicate", message=msg,
+                         id_number=r["data"]["id_number"], id_valid=r["data"].get("id_valid", False))
+        entries.append(entry)
+
+    manifest.write("".join(json.dumps(e) + "\n" for e in entries))
+    manifest.flush()
+    os.fsync(manifest.fileno())
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingestion scan DNI (OCR + parse) dengan process pool.")
+    parser.add_argument("input_dir", help="Folder berisi scan DNI (dibaca rekursif).")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads-per-worker", type=int, default=2)
+    parser.add_argument("--commit-every", type=int, default=50, help="Jumlah file per commit database.")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="Manifest JSONL (resume + laporan per file).")
+    parser.add_argument("--preprocess", action="store_true", help="Lokalisasi + normalisasi kartu sebelum OCR.")
+    parser.add_argument("--field-regions", action="store_true",
+                        help="OCR hanya region field kartu (mengaktifkan --preprocess).")
+    args = parser.parse_args()
+
+    files = list_images(args.input_dir)
+    done = load_manifest(args.manifest)
+    pending = [f for f in files if f not in done]
+    print(f"[Ingest] {len(files)} files, {len(done & set(files))} already done, {len(pending)} to process.")
+    if not pending:
+        return
+
+    db = Database()
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+
+    entries, buffer = [], []
+    start = time.perf_counter()
+    with open(args.manifest, 'a') as manifest, ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker,
+        initargs=(args.threads_per_worker, args.preprocess, args.field_regions)
+    ) as pool:
+        futures = [pool.submit(_process_file, f) for f in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            buffer.append(future.result())
+            if len(buffer) >= args.commit_every:
+                entries += commit(db, buffer, manifest)
+                buffer = []
+                rate = i / (time.perf_counter() - start)
+                print(f"[Ingest] {i}/{len(pending)} files ({rate:.2f} files/s)")
+
+        if buffer:
+            entries += commit(db, buffer, manifest)
+
+    elapsed = time.perf_counter() - start
+    latencies = np.array([e["ms"] for e in entries])
+    statuses = {}
+    for e in entries:
+        statuses[e["status"]] = statuses.get(e["status"], 0) + 1
+
+    print("\n--- INGESTION REPORT ---")
+    print(f"Files processed : {len(entries)} in {elapsed:.1f}s ({len(entries) / elapsed:.2f} files/s, {args.workers} workers)")
+    print(f"Per-file OCR ms : mean {latencies.mean():.0f}, p50 {np.percentile(latencies, 50):.0f}, p95 {np.percentile(latencies, 95):.0f}")
+    print(f"Status          : {statuses}")
+    print(f"Per-file report : {args.manifest}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,67 @@
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware # <--- PENTING: Import CORS
-from PIL import Image
-import io
+import asyncio
 import logging
+import time
 
 # Import pipeline logic dari folder src
 from src.pipeline import KYCPipeline 
+from src.batcher import MicroBatcher
+from src.worker_pool import PipelineWorkerPool, PoolSaturatedError
+from src import telemetry
+from src.image_decode import decode_image, scale_bbox, FACE_MAX_SIDE, OCR_MAX_SIDE
+
+# --- MODEL ---
+# Mode kuantisasi FaceEngine: 'none' (Float32), 'dynamic', atau 'fx_static'.
+# Default Float32: galeri yang sudah ada di-enroll dengan Float32 dan MATCH_THRESHOLD dikalibrasi
+# untuk itu. Aktifkan 'fx_static' hanya setelah verify_quantization.py menunjukkan kesesuaian
+# (cosine vs Float32 & keputusan match) pada data Anda, lalu re-enroll galeri dengan mode yang sama.
+QUANTIZATION_MODE = "none"
+# Runtime model wajah: 'eager', 'torchscript' atau 'onnx' (jalankan export_face_model.py dulu)
+FACE_RUNTIME = "eager"
+
+# --- GALERI EMBEDDING ---
+# Kode galeri resident: 'float32' (2 KB/embedding), 'float16' (1 KB) atau 'int8' (~0.5 KB).
+# Dengan float16/int8, RERANK_CANDIDATES teratas dinilai ulang dengan float32 dari disk (memmap).
+EMBEDDING_CODEC = "float32"
+RERANK_CANDIDATES = 32
+# Exact scan galeri besar dibagi ke N proses worker (memmap bersama). 0 = nonaktif.
+SEARCH_SHARDS = 0
+
+# --- ONBOARDING ---
+# True = onboarding tetap disimpan walau foto wajah di ID Card tidak terdeteksi (selfie tidak
+# diverifikasi terhadap kartu). Default False: request ditolak dan tidak ada yang ditulis.
+ONBOARDING_ALLOW_NO_PORTRAIT = False
+
+# --- RESULT CACHE (embedding & OCR per konten gambar) ---
+RESULT_CACHE_SIZE = 1024      # 0 = nonaktif
+RESULT_CACHE_TTL = 3600       # detik
+RESULT_CACHE_PATH = None      # mis. "data/result_cache.db" untuk persistensi di disk
+
+# --- MICRO-BATCHING ---
+# Request yang datang dalam MAX_WAIT_MS digabung menjadi satu batched forward + satu matmul galeri
+MICRO_BATCHING = True
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 5.0
+
+# --- WORKER POOL (inferensi di luar event loop) ---
+# OCR dan wajah memakai pool terpisah agar bisa di-size sendiri-sendiri; batch dari
+# micro-batching juga dijalankan di pool wajah (FACE_WORKERS batch bisa berjalan bersamaan).
+# POOL_KIND: 'thread' (berbagi pipeline) atau 'process' (pipeline per proses worker,
+# dimuat dengan PIPELINE_CONFIG yang sama; worker pool wajah hanya memuat engine wajah)
+POOL_KIND = "thread"
+OCR_WORKERS = 1
+OCR_MAX_QUEUE = 8
+FACE_WORKERS = 2
+FACE_MAX_QUEUE = 32
+
+# --- INSTRUMENTASI ---
+# Span per stage + endpoint /metrics (Prometheus). Breakdown waktu dikembalikan di response
+# hanya jika request membawa header DEBUG_HEADER (mis. "X-KYC-Debug: 1").
+TELEMETRY_ENABLED = True
+DEBUG_HEADER = "X-KYC-Debug"
 
 # Setup Logging
 logging.basicConfig(
@@ -32,56 +87,173 @@ app.add_middleware(
     allow_headers=["*"],  # Mengizinkan semua headers
 )
 
+telemetry.enable(TELEMETRY_ENABLED)
+HTTP_SECONDS = telemetry.histogram("kyc_http_request_duration_seconds", "Durasi request HTTP.", ("path",))
+HTTP_REQUESTS = telemetry.counter("kyc_http_requests_total", "Jumlah request HTTP per status.", ("path", "code"))
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    if not telemetry.is_enabled() or request.url.path == "/metrics":
+        return await call_next(request)
+
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    # Label = template route (mis. /users/{id}); path mentah dari 404/scanner membuat series baru tanpa batas
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    HTTP_SECONDS.observe(time.perf_counter() - t0, path)
+    HTTP_REQUESTS.inc(path, response.status_code)
+    return response
+
+# Konfigurasi pipeline dipakai bersama oleh proses utama dan worker proses (POOL_KIND='process')
+PIPELINE_CONFIG = dict(
+    quantization=QUANTIZATION_MODE, face_runtime=FACE_RUNTIME,
+    cache_size=RESULT_CACHE_SIZE, cache_ttl=RESULT_CACHE_TTL, cache_path=RESULT_CACHE_PATH,
+    embedding_codec=EMBEDDING_CODEC, rerank=RERANK_CANDIDATES, search_shards=SEARCH_SHARDS,
+    onboarding_allow_no_portrait=ONBOARDING_ALLOW_NO_PORTRAIT
+)
+
 # Inisialisasi Pipeline KYC
 try:
-    pipeline = KYCPipeline()
-    logger.info("✅ Pipeline initialized successfully.")
+    pipeline = KYCPipeline(**PIPELINE_CONFIG)
+    logger.info(f"✅ Pipeline initialized successfully. Startup: {pipeline.startup_timings}")
 except Exception as e:
     logger.error(f"❌ Failed to initialize pipeline: {e}")
     raise e
 
+# OCR pool juga menjalankan onboarding (OCR + wajah) -> kedua engine
+ocr_pool = PipelineWorkerPool("ocr", pipeline, POOL_KIND, OCR_WORKERS, OCR_MAX_QUEUE,
+                              config=PIPELINE_CONFIG)
+face_pool = PipelineWorkerPool("face", pipeline, POOL_KIND, FACE_WORKERS, FACE_MAX_QUEUE,
+                               config={**PIPELINE_CONFIG, "engines": ("face",)})
+
+def face_pool_handler(method: str):
+    """Handler MicroBatcher: satu batch = satu task di face_pool (Future, tidak memblok batcher)."""
+    return lambda items: face_pool.submit(method, items)
+
+match_batcher = None
+verify_batcher = None
+face_batcher = None
+if MICRO_BATCHING:
+    match_batcher = MicroBatcher(face_pool_handler("kyc_match_batch"), MAX_BATCH_SIZE, MAX_WAIT_MS,
+                                 name="kyc-check", max_queue=FACE_MAX_QUEUE)
+    verify_batcher = MicroBatcher(face_pool_handler("kyc_verify_batch"), MAX_BATCH_SIZE, MAX_WAIT_MS,
+                                  name="kyc-verify", max_queue=FACE_MAX_QUEUE)
+    face_batcher = MicroBatcher(face_pool_handler("process_face_registration_batch"), MAX_BATCH_SIZE, MAX_WAIT_MS,
+                                name="register-face", max_queue=FACE_MAX_QUEUE)
+    logger.info(f"Micro-batching enabled (max_batch={MAX_BATCH_SIZE}, max_wait={MAX_WAIT_MS}ms).")
+
+# Nilai sesaat yang ikut dicatat di setiap span dan di /metrics
+telemetry.register_gauge("kyc_gallery_size", lambda: pipeline.gallery.size)
+telemetry.register_gauge("kyc_queue_depth", ocr_pool.queue_depth, queue="ocr")
+telemetry.register_gauge("kyc_queue_depth", face_pool.queue_depth, queue="face")
+if MICRO_BATCHING:
+    telemetry.register_gauge("kyc_queue_depth", match_batcher.qsize, queue="kyc-check")
+    telemetry.register_gauge("kyc_queue_depth", verify_batcher.qsize, queue="kyc-verify")
+    telemetry.register_gauge("kyc_queue_depth", face_batcher.qsize, queue="register-face")
+
+def pool_unavailable(e: PoolSaturatedError) -> HTTPException:
+    logger.warning(f"Request rejected: {e}")
+    return HTTPException(status_code=503, detail="Server sedang sibuk, silakan coba lagi.")
+
+def decode_upload(contents: bytes, max_side: int):
+    """Decode sekali (draft + EXIF + batas sisi) -> (array RGB, scale). Dijalankan di luar event loop."""
+    with telemetry.span("upload.decode"):
+        return decode_image(contents, max_side)
+
+def finalize(request: Request, result: dict, t0: float) -> dict:
+    """Sertakan breakdown waktu hanya jika header debug diset; selain itu buang dari response."""
+    spans = result.pop("timings", None)
+    if request.headers.get(DEBUG_HEADER) and spans is not None:
+        total_ms = (time.perf_counter() - t0) * 1000
+        # Span terluar (flow pipeline) selesai paling akhir
+        pipeline_ms = spans[-1]["ms"] if spans else 0.0
+        result = {**result, "timings": {
+            "total_ms": round(total_ms, 3),
+            # Sisa waktu di luar pipeline: decode upload, antrian pool/batcher, serialisasi
+            "outside_pipeline_ms": round(total_ms - pipeline_ms, 3),
+            "spans": spans,
+        }}
+    return result
+
+def run_warmup():
+    try:
+        pipeline.warmup()
+        logger.info(f"✅ Pipeline warm & ready. Startup: {pipeline.startup_timings}")
+    except Exception as e:
+        logger.error(f"❌ Pipeline warmup failed, /ready stays false: {e}")
+
+@app.on_event("startup")
+async def start_warmup():
+    # Warmup berjalan setelah server mulai menerima koneksi; /ready baru true setelah selesai,
+    # sehingga load balancer tidak mengirim traffic ke instance yang masih dingin.
+    asyncio.get_running_loop().run_in_executor(None, run_warmup)
+
 # --- ENDPOINTS ---
 
 @app.get("/")
 def root():
     return {"message": "KYC Engine is Running & CORS is Enabled!"}
 
+@app.get("/ready")
+def ready():
+    if not pipeline.ready:
+        raise HTTPException(status_code=503, detail="Pipeline belum siap.")
+    return {"ready": True, "startup_timings": pipeline.startup_timings}
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    if pipeline.result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **pipeline.result_cache.stats()}
+
 # 1. Registrasi ID Card
 @app.post("/register-idcard")
-async def register_idcard(image: UploadFile = File(...)):
+async def register_idcard(request: Request, image: UploadFile = File(...)):
     # Validasi tipe file
     if not image.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File harus berupa gambar.")
         
     try:
         # Baca file gambar
+        t0 = time.perf_counter()
         contents = await image.read()
-        image_pil = Image.open(io.BytesIO(contents))
+        image_np, _ = await asyncio.to_thread(decode_upload, contents, OCR_MAX_SIDE)
         
         # Proses dengan Pipeline
         logger.info("Processing ID Card...")
-        result = pipeline.process_id_card(image_pil)
-        return result
-        
+        result = await asyncio.wrap_future(ocr_pool.submit("process_id_card", image_np))
+        return finalize(request, result, t0)
+
+    except PoolSaturatedError as e:
+        raise pool_unavailable(e)
     except Exception as e:
         logger.error(f"Error processing ID card: {e}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 # 2. Registrasi Wajah
 @app.post("/register-face")
-async def register_face(id_number: str = Form(...), image: UploadFile = File(...)):
+async def register_face(request: Request, id_number: str = Form(...), image: UploadFile = File(...)):
     if not image.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File harus berupa gambar.")
         
     try:
+        t0 = time.perf_counter()
         contents = await image.read()
-        image_pil = Image.open(io.BytesIO(contents))
         
         # Bersihkan ID Number
         clean_id = id_number.strip().upper()
         
-        # Ambil Nama Lengkap dari Database (karena frontend tidak mengirim nama)
-        user_data = pipeline.db.get_user_by_id(clean_id)
+        # Decode dan ambil Nama Lengkap dari Database (karena frontend tidak mengirim nama)
+        # paralel di thread, agar query SQLite tidak memblok event loop
+        (image_np, _), user_data = await asyncio.gather(
+            asyncio.to_thread(decode_upload, contents, FACE_MAX_SIDE),
+            asyncio.to_thread(pipeline.db.get_user_by_id, clean_id),
+        )
         if not user_data:
             return {
                 "status": "error", 
@@ -92,32 +264,104 @@ async def register_face(id_number: str = Form(...), image: UploadFile = File(...
         
         # Proses Registrasi Wajah
         logger.info(f"Registering face for {clean_id} ({full_name})...")
-        result = pipeline.process_face_registration(image_pil, clean_id, full_name)
-        return result
+        if face_batcher is not None:
+            result = await asyncio.wrap_future(face_batcher.submit((image_np, clean_id, full_name)))
+        else:
+            result = await asyncio.wrap_future(
+                face_pool.submit("process_face_registration", image_np, clean_id, full_name)
+            )
+        return finalize(request, result, t0)
 
+    except PoolSaturatedError as e:
+        raise pool_unavailable(e)
     except Exception as e:
         logger.error(f"Error registering face: {e}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 # 3. Verifikasi KYC
 @app.post("/kyc-check")
-async def kyc_check(image: UploadFile = File(...)):
+async def kyc_check(request: Request, image: UploadFile = File(...)):
     if not image.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File harus berupa gambar.")
         
     try:
+        t0 = time.perf_counter()
         contents = await image.read()
-        image_pil = Image.open(io.BytesIO(contents))
+        image_np, scale = await asyncio.to_thread(decode_upload, contents, FACE_MAX_SIDE)
         
         # Proses Matching
         logger.info("Performing KYC Check...")
-        result = pipeline.kyc_match(image_pil)
-        return result
-        
+        if match_batcher is not None:
+            result = await asyncio.wrap_future(match_batcher.submit(image_np))
+        else:
+            result = await asyncio.wrap_future(face_pool.submit("kyc_match", image_np))
+
+        # Bounding box dihitung pada gambar yang diperkecil -> kembalikan ke koordinat upload asli
+        result["face_bbox"] = scale_bbox(result.get("face_bbox"), scale)
+        return finalize(request, result, t0)
+
+    except PoolSaturatedError as e:
+        raise pool_unavailable(e)
     except Exception as e:
         logger.error(f"Error KYC check: {e}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+# 4. Verifikasi 1:1 (selfie vs ID yang diklaim)
+@app.post("/kyc-verify")
+async def kyc_verify(request: Request, id_number: str = Form(...), image: UploadFile = File(...)):
+    if not image.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File harus berupa gambar.")
+
+    try:
+        t0 = time.perf_counter()
+        contents = await image.read()
+        image_np, scale = await asyncio.to_thread(decode_upload, contents, FACE_MAX_SIDE)
+
+        clean_id = id_number.strip().upper()
+
+        # Hanya embedding milik clean_id yang dibandingkan (biaya tidak tergantung ukuran galeri)
+        logger.info(f"Performing 1:1 KYC verification for {clean_id}...")
+        if verify_batcher is not None:
+            result = await asyncio.wrap_future(verify_batcher.submit((image_np, clean_id)))
+        else:
+            result = await asyncio.wrap_future(face_pool.submit("kyc_verify", image_np, clean_id))
+
+        result["face_bbox"] = scale_bbox(result.get("face_bbox"), scale)
+        return finalize(request, result, t0)
+
+    except PoolSaturatedError as e:
+        raise pool_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error KYC verify: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+# 5. Onboarding sekaligus (ID Card + selfie dalam satu request)
+@app.post("/onboard")
+async def onboard(request: Request, id_card: UploadFile = File(...), selfie: UploadFile = File(...)):
+    if not id_card.content_type.startswith('image/') or not selfie.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File harus berupa gambar.")
+
+    try:
+        t0 = time.perf_counter()
+        card_contents, selfie_contents = await asyncio.gather(id_card.read(), selfie.read())
+        (card_np, _), (selfie_np, selfie_scale) = await asyncio.gather(
+            asyncio.to_thread(decode_upload, card_contents, OCR_MAX_SIDE),
+            asyncio.to_thread(decode_upload, selfie_contents, FACE_MAX_SIDE),
+        )
+
+        # OCR jalan di worker OCR; deteksi + embedding wajah paralel di dalam pipeline
+        logger.info("Processing onboarding (ID Card + selfie)...")
+        result = await asyncio.wrap_future(ocr_pool.submit("process_onboarding", card_np, selfie_np))
+
+        result["face_bbox"] = scale_bbox(result.get("face_bbox"), selfie_scale)
+        return finalize(request, result, t0)
+
+    except PoolSaturatedError as e:
+        raise pool_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error onboarding: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
 # Entry point untuk debugging langsung
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+
+from src.embedding_store import EmbeddingStore, migrate_csv
+
+# --- KONFIGURASI DEFAULT (SAMA DENGAN src/database.py) ---
+CSV_FILE = "data/embeddings.csv"
+MATRIX_FILE = "data/embeddings.bin"
+INDEX_FILE = "data/embeddings_index.csv"
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrasi embeddings.csv ke embedding store biner (memmap).")
+    parser.add_argument("--csv", default=CSV_FILE, help="File CSV lama (id, nama, vektor).")
+    parser.add_argument("--matrix", default=MATRIX_FILE, help="File matriks float32 tujuan.")
+    parser.add_argument("--index", default=INDEX_FILE, help="File sidecar index ID/Nama tujuan.")
+    parser.add_argument("--force", action="store_true", help="Timpa store yang sudah ada.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"Error: File {args.csv} tidak ditemukan.")
+        sys.exit(1)
+
+    if os.path.exists(args.matrix):
+        if not args.force:
+            print(f"Error: {args.matrix} sudah ada. Gunakan --force untuk menimpa.")
+            sys.exit(1)
+        os.remove(args.matrix)
+        if os.path.exists(args.index):
+            os.remove(args.index)
+
+    store = EmbeddingStore(args.matrix, args.index)
+    total = migrate_csv(args.csv, store)
+
+    ids, names, vectors = store.load()
+    print(f"✅ Migrasi selesai: {total} embeddings -> {args.matrix} (shape {vectors.shape}).")
+
+if __name__ == "__main__":
+    main()
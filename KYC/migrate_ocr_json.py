@@ -0,0 +1,26 @@
+import argparse
+import os
+import sys
+
+from src.record_store import OCRRecordStore, import_json
+
+# --- KONFIGURASI DEFAULT (SAMA DENGAN src/database.py) ---
+JSON_FILE = "data/id_data.json"
+DB_FILE = "data/id_data.db"
+
+def main():
+    parser = argparse.ArgumentParser(description="Import id_data.json lama ke OCR record store (SQLite).")
+    parser.add_argument("--json", default=JSON_FILE, help="File JSON lama ({id_number: data}).")
+    parser.add_argument("--db", default=DB_FILE, help="File SQLite tujuan.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.json):
+        print(f"Error: File {args.json} tidak ditemukan.")
+        sys.exit(1)
+
+    store = OCRRecordStore(args.db)
+    imported = import_json(args.json, store)
+    print(f"✅ Import selesai: {imported} record baru -> {args.db} (total {store.count()}).")
+
+if __name__ == "__main__":
+    main()
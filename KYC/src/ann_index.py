@@ -0,0 +1,232 @@
+import os
+import json
+import numpy as np
+
+
+def select_top_k(scores: np.ndarray, top_k: int):
+    """Indeks top-k (terurut menurun) dari array skor 1D."""
+    top_k = min(top_k, scores.shape[0])
+    if top_k <= 0:
+        return np.array([], dtype=np.int64)
+    if top_k == 1:
+        return np.array([int(np.argmax(scores))], dtype=np.int64)
+
+    idx = np.argpartition(-scores, top_k - 1)[:top_k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class ExactIndex:
+    """
+    Brute-force scan (fallback). Skor = vectors @ query pada galeri ter-normalisasi.
+    Tidak menyimpan struktur tambahan, jadi build/add/save/load tidak melakukan apa-apa.
+    """
+    name = "exact"
+
+    def __init__(self):
+        self.ntotal = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    def reset(self):
+        self.ntotal = 0
+
+    def fresh(self):
+        return ExactIndex()
+
+    def build(self, vectors: np.ndarray, n: int | None = None):
+        self.ntotal = vectors.shape[0] if n is None else n
+
+    def add(self, vectors: np.ndarray):
+        self.ntotal += vectors.shape[0]
+
+    def needs_rebuild(self) -> bool:
+        return False
+
+    def search(self, query: np.ndarray, vectors: np.ndarray, top_k: int = 1):
+        scores = vectors[:self.ntotal] @ query
+        idx = select_top_k(scores, top_k)
+        return idx, scores[idx]
+
+    def save(self, path: str, source: dict | None = None):
+        pass
+
+    def load(self, path: str) -> bool:
+        return False
+
+
+class IVFIndex:
+    """
+    Inverted File Index (IVF) berbasis NumPy untuk cosine similarity.
+    - build  : spherical k-means -> `nlist` centroid, tiap vektor masuk ke list centroid terdekat
+    - search : hanya `nprobe` list terdekat yang di-scan (knob recall vs latency)
+    Vektor tidak disalin: index hanya menyimpan nomor baris galeri per list.
+    """
+    name = "ivf"
+
+    def __init__(self, nlist: int | None = None, nprobe: int = 8,
+                 min_train_size: int = 10000, n_iter: int = 15, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.n_iter = n_iter
+        self.seed = seed
+        # Identitas galeri saat index disimpan/dimuat (diisi oleh GalleryCache untuk validasi)
+        self.source = None
+        self.reset()
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def reset(self):
+        self.centroids = None
+        self.lists = []
+        self.ntotal = 0
+        self.trained_size = 0
+
+    def fresh(self):
+        """Index kosong dengan konfigurasi yang sama (untuk rebuild di background)."""
+        return IVFIndex(self.nlist, self.nprobe, self.min_train_size, self.n_iter, self.seed)
+
+    # --- TRAINING ---
+    def _kmeans(self, vectors: np.ndarray, n: int, nlist: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+
+        # Sampling agar training tetap murah untuk galeri jutaan baris
+        n_sample = min(n, nlist * 256)
+        sample_idx = rng.choice(n, n_sample, replace=False)
+        sample = np.asarray(vectors[np.sort(sample_idx)], dtype=np.float32)
+
+        centroids = sample[rng.choice(n_sample, nlist, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+
+            # Centroid kosong diisi ulang dengan sampel acak
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(n_sample, int(empty.sum()), replace=False)]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        return centroids.astype(np.float32)
+
+    def _assign(self, vectors: np.ndarray, n: int | None = None, chunk_size: int = 65536) -> np.ndarray:
+        n = vectors.shape[0] if n is None else n
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, chunk_size):
+            block = vectors[start:min(start + chunk_size, n)]
+            assign[start:start + chunk_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return assign
+
+    def _extend_lists(self, assign: np.ndarray, row_offset: int):
+        order = np.argsort(assign, kind='stable')
+        bounds = np.searchsorted(assign[order], np.arange(len(self.lists) + 1))
+        for list_id in range(len(self.lists)):
+            rows = order[bounds[list_id]:bounds[list_id + 1]]
+            if rows.size:
+                self.lists[list_id] = np.concatenate([self.lists[list_id], rows + row_offset])
+
+    def build(self, vectors: np.ndarray, n: int | None = None):
+        """
+        Latih centroid dan isi inverted list dari `n` baris pertama galeri (default: semua).
+        `n` eksplisit memungkinkan build di thread lain selagi galeri terus bertambah.
+        """
+        self.reset()
+        n = vectors.shape[0] if n is None else n
+        if n < max(self.min_train_size, 1):
+            # Belum cukup data: tetap dihitung, search jatuh ke exact scan
+            self.ntotal = n
+            return
+
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        self.centroids = self._kmeans(vectors, n, nlist)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self._extend_lists(self._assign(vectors, n), 0)
+        self.ntotal = n
+        self.trained_size = n
+
+    def add(self, vectors: np.ndarray):
+        """Tambah vektor baru (baris berikutnya di galeri) ke list centroid terdekat."""
+        if self.is_trained and vectors.shape[0]:
+            self._extend_lists(self._assign(vectors), self.ntotal)
+        self.ntotal += vectors.shape[0]
+
+    def needs_rebuild(self) -> bool:
+        """Latih ulang jika data cukup tapi belum dilatih, atau galeri tumbuh > 4x sejak training."""
+        if not self.is_trained:
+            return self.ntotal >= self.min_train_size
+        return self.ntotal > 4 * self.trained_size
+
+    # --- SEARCH ---
+    def search(self, query: np.ndarray, vectors: np.ndarray, top_k: int = 1, nprobe: int | None = None):
+        if not self.is_trained:
+            scores = vectors[:self.ntotal] @ query
+            idx = select_top_k(scores, top_k)
+            return idx, scores[idx]
+
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        probe = select_top_k(self.centroids @ query, nprobe)
+        candidates = np.concatenate([self.lists[i] for i in probe])
+        if candidates.size == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        candidates.sort()  # akses memori berurutan
+        scores = vectors[candidates] @ query
+        idx = select_top_k(scores, top_k)
+        return candidates[idx], scores[idx]
+
+    # --- PERSISTENCE ---
+    def save(self, path: str, source: dict | None = None):
+        """Simpan index beserta `source` (identitas galeri) agar bisa divalidasi saat load."""
+        if not self.is_trained:
+            return
+        self.source = source
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        sizes = np.array([lst.size for lst in self.lists], dtype=np.int64)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            sizes=sizes,
+            rows=np.concatenate(self.lists) if self.lists else np.empty(0, dtype=np.int64),
+            meta=np.array([self.ntotal, self.trained_size], dtype=np.int64),
+            source=np.array(json.dumps(source)),
+        )
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+
+        with np.load(path) as data:
+            self.centroids = data['centroids']
+            bounds = np.concatenate([[0], np.cumsum(data['sizes'])])
+            rows = data['rows']
+            self.lists = [rows[bounds[i]:bounds[i + 1]].copy() for i in range(len(bounds) - 1)]
+            self.ntotal, self.trained_size = (int(x) for x in data['meta'])
+            # File lama tanpa source -> None (akan ditolak GalleryCache)
+            self.source = json.loads(str(data['source'])) if 'source' in data.files else None
+        return True
+
+
+def create_index(kind: str = "exact", **kwargs):
+    """
+    Factory index pencarian galeri: 'exact' (fallback) atau 'ivf'.
+    kwargs (nlist, nprobe, ...) hanya dipakai oleh IVF.
+    """
+    if kind == "exact":
+        return ExactIndex()
+    if kind == "ivf":
+        return IVFIndex(**kwargs)
+    raise ValueError(f"Search index '{kind}' tidak dikenal. Gunakan 'exact' atau 'ivf'.")
@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .worker_pool import PoolSaturatedError
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Penggabung request (dynamic micro-batching).
+    Request yang datang dalam jendela `max_wait_ms` digabung (maks `max_batch_size`)
+    lalu diproses sekali oleh `handler(list_item) -> list_hasil` di thread background.
+    Handler juga boleh mengembalikan Future berisi list_hasil (mis. task di PipelineWorkerPool):
+    batch berikutnya langsung dikumpulkan sementara batch sebelumnya masih diproses worker.
+    Setiap pemanggil mendapat Future sendiri. Jika `max_queue` diisi, request ditolak
+    dengan PoolSaturatedError saat antrian penuh.
+    """
+
+    def __init__(self, handler, max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 name: str = "MicroBatcher", max_queue: int | None = None):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.max_queue = max_queue
+
+        self.batches = 0
+        self.items = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        if self.max_queue is not None and self._queue.qsize() >= self.max_queue:
+            raise PoolSaturatedError(f"{self.name} queue saturated ({self.max_queue}).")
+
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if entry is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = self._collect(first)
+            items = [item for item, _ in batch]
+
+            try:
+                results = self.handler(items)
+            except Exception as e:
+                self._fail(batch, e)
+            else:
+                if isinstance(results, Future):
+                    results.add_done_callback(lambda f, batch=batch: self._complete(batch, f))
+                else:
+                    self._deliver(batch, results)
+
+            self.batches += 1
+            self.items += len(batch)
+
+    def _complete(self, batch: list, future: Future):
+        try:
+            results = future.result()
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        self._deliver(batch, results)
+
+    def _deliver(self, batch: list, results):
+        try:
+            results = list(results)
+            # zip() akan diam-diam membuang sisa item -> Future-nya tidak pernah selesai
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: handler mengembalikan {len(results)} hasil "
+                                   f"untuk {len(batch)} item.")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            self._fail(batch, e)
+
+    @staticmethod
+    def _fail(batch: list, error: Exception):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queue_depth": self.qsize(),
+        }
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+
+# Ukuran kanonik kartu ID-1 (85.6 x 54 mm, rasio ~1.586) setelah deskew
+CANONICAL_SIZE = (1000, 630)  # (lebar, tinggi)
+CARD_ASPECT = 85.6 / 54.0
+
+# Resolusi maksimum jika kartu tidak ditemukan (fallback gambar penuh)
+FALLBACK_MAX_SIDE = 1600
+
+# Resolusi kerja untuk deteksi kontur (deteksi tidak butuh 12 MP)
+DETECT_MAX_SIDE = 800
+
+# Region field DNI Spanyol pada kartu kanonik (x0, y0, x1, y1) dalam fraksi lebar/tinggi.
+# Urutan penting: IDParser membaca blok secara berurutan (label -> nilai).
+FIELD_REGIONS = {
+    "id_number_top": (0.00, 0.00, 1.00, 0.22),
+    "names": (0.30, 0.18, 1.00, 0.58),
+    "dob": (0.30, 0.52, 1.00, 0.82),
+    "id_number_bottom": (0.00, 0.78, 0.60, 1.00),
+}
+
+
+def _resize_max_side(image: np.ndarray, max_side: int):
+    h, w = image.shape[:2]
+    scale = min(1.0, max_side / float(max(h, w)))
+    if scale >= 1.0:
+        return image, 1.0
+    resized = cv2.resize(image, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+def _order_corners(pts: np.ndarray) -> np.ndarray:
+    """Urutkan 4 titik: kiri-atas, kanan-atas, kanan-bawah, kiri-bawah."""
+    pts = pts.reshape(4, 2).astype(np.float32)
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+
+def find_card_quad(image: np.ndarray, min_area_ratio: float = 0.2, aspect_tolerance: float = 0.35):
+    """
+    Cari kontur segi empat terbesar yang menyerupai kartu ID-1.
+    Mengembalikan 4 sudut (koordinat gambar asli) atau None.
+    """
+    small, scale = _resize_max_side(image, DETECT_MAX_SIDE)
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(gray, 50, 150)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=2)
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_ratio * small.shape[0] * small.shape[1]
+
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contour) < min_area:
+            break
+
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) != 4:
+            continue
+
+        quad = _order_corners(approx)
+        width = (np.linalg.norm(quad[1] - quad[0]) + np.linalg.norm(quad[2] - quad[3])) / 2
+        height = (np.linalg.norm(quad[3] - quad[0]) + np.linalg.norm(quad[2] - quad[1])) / 2
+        if min(width, height) == 0:
+            continue
+
+        aspect = max(width, height) / min(width, height)
+        if abs(aspect - CARD_ASPECT) / CARD_ASPECT <= aspect_tolerance:
+            return quad / scale
+
+    return None
+
+
+def normalize_card(image: np.ndarray):
+    """
+    Lokalisasi kartu -> crop + deskew (perspective warp) -> resolusi kanonik.
+    Jika kartu tidak ditemukan, kembalikan gambar penuh yang diperkecil ke FALLBACK_MAX_SIDE.
+    Mengembalikan (gambar RGB, found).
+    """
+    quad = find_card_quad(image)
+    if quad is None:
+        resized, _ = _resize_max_side(image, FALLBACK_MAX_SIDE)
+        return resized, False
+
+    # Kartu difoto vertikal -> putar urutan sudut agar hasil tetap landscape
+    width = np.linalg.norm(quad[1] - quad[0])
+    height = np.linalg.norm(quad[3] - quad[0])
+    if height > width:
+        quad = np.roll(quad, -1, axis=0)
+
+    w, h = CANONICAL_SIZE
+    target = np.array([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(quad.astype(np.float32), target)
+    warped = cv2.warpPerspective(image, matrix, (w, h), flags=cv2.INTER_AREA)
+    return warped, True
+
+
+def crop_regions(card: np.ndarray, regions: dict = FIELD_REGIONS):
+    """Potong region field dari kartu kanonik. Mengembalikan list (nama, crop, (x0, y0))."""
+    h, w = card.shape[:2]
+    crops = []
+    for name, (x0, y0, x1, y1) in regions.items():
+        px0, py0, px1, py1 = int(x0 * w), int(y0 * h), int(x1 * w), int(y1 * h)
+        crops.append((name, card[py0:py1, px0:px1], (px0, py0)))
+    return crops
@@ -1,72 +1,61 @@
-import pandas as pd
 import numpy as np
 import os
-import json # <--- IMPORT TAMBAHAN
 from typing import List
 
+from .embedding_store import EmbeddingStore, migrate_csv
+from .record_store import OCRRecordStore, import_json
+from . import telemetry
+
 class Database:
     def __init__(self):
-        self.EMBEDDING_FILE = "data/embeddings.csv" 
-        self.OCR_FILE = "data/id_data.json"
+        self.EMBEDDING_FILE = "data/embeddings.bin"
+        self.EMBEDDING_INDEX_FILE = "data/embeddings_index.csv"
+        self.LEGACY_EMBEDDING_FILE = "data/embeddings.csv"
+        self.OCR_FILE = "data/id_data.db"
+        self.LEGACY_OCR_FILE = "data/id_data.json"
+
+        self.embedding_store = EmbeddingStore(self.EMBEDDING_FILE, self.EMBEDDING_INDEX_FILE)
+
+        # Migrasi otomatis sekali jalan dari CSV lama jika store biner belum ada
+        if not self.embedding_store.exists() and os.path.exists(self.LEGACY_EMBEDDING_FILE):
+            migrated = migrate_csv(self.LEGACY_EMBEDDING_FILE, self.embedding_store)
+            print(f"[Database] Migrated {migrated} embeddings from {self.LEGACY_EMBEDDING_FILE} to {self.EMBEDDING_FILE}.")
+
+        # Data OCR: SQLite ter-index (import otomatis dari JSON lama jika DB baru dibuat)
+        is_new_db = not os.path.exists(self.OCR_FILE)
+        self.ocr_store = OCRRecordStore(self.OCR_FILE)
+        if is_new_db and os.path.exists(self.LEGACY_OCR_FILE):
+            imported = import_json(self.LEGACY_OCR_FILE, self.ocr_store)
+            print(f"[Database] Imported {imported} OCR records from {self.LEGACY_OCR_FILE} to {self.OCR_FILE}.")
         
     # --- METHOD UNTUK MENGAMBIL DATA OCR SAAT KYCMATCH ---
     def get_user_by_id(self, id_number: str) -> dict | None:
         """
-        Mengambil data OCR pengguna dari JSON berdasarkan ID Number.
+        Mengambil data OCR pengguna berdasarkan ID Number (lookup PRIMARY KEY).
         """
-        # os.path.exists membutuhkan import os
-        if not os.path.exists(self.OCR_FILE):
-            return None
-        
         try:
-            with open(self.OCR_FILE, 'r') as f:
-                data = json.load(f)
-                
-            # ID tersimpan sebagai key utama di JSON
-            return data.get(id_number)
-            
-        except json.JSONDecodeError:
-            return None
+            with telemetry.span("db.get_user_by_id"):
+                return self.ocr_store.get(id_number)
         except Exception:
             return None
 
     # --- METHOD UNTUK MENYIMPAN EMBEDDING ---
     def save_embedding(self, id_number, full_name, embedding_vector):
-        """Menyimpan embedding baru ke CSV tanpa header dan tanpa index."""
-        
-        vector_list = embedding_vector.tolist() 
-        row = [id_number, full_name] + vector_list
-        
-        df_new = pd.DataFrame([row])
-        
-        df_new.to_csv(
-            self.EMBEDDING_FILE, 
-            mode='a', 
-            header=False, 
-            index=False,
-        )
+        """Menambahkan embedding baru ke store biner (append O(1))."""
+        with telemetry.span("db.save_embedding"):
+            self.embedding_store.append(id_number, full_name, embedding_vector)
+
+    def save_embeddings(self, ids: list, names: list, embedding_vectors):
+        """Menambahkan banyak embedding sekaligus (satu kali tulis ke store)."""
+        with telemetry.span("db.save_embedding", batch=len(ids)):
+            self.embedding_store.append_many(ids, names, embedding_vectors)
 
     # --- METHOD UNTUK MEMUAT SEMUA EMBEDDING ---
     def load_embeddings(self):
-        """Memuat data embeddings dari embeddings.csv."""
-        
-        if not os.path.exists(self.EMBEDDING_FILE) or os.path.getsize(self.EMBEDDING_FILE) == 0:
-            return [], [], np.array([]) 
-
+        """Memuat (ids, names, db_vectors). db_vectors berupa memmap float32 tanpa copy."""
         try:
-            df = pd.read_csv(self.EMBEDDING_FILE, header=None)
-            
-            if df.empty:
-                return [], [], np.array([])
-
-            # Ekstrak ID dan Nama (Kolom 0 dan 1)
-            ids = df.iloc[:, 0].astype(str).tolist()
-            names = df.iloc[:, 1].astype(str).tolist()
-            
-            # Ekstrak Vektor (Kolom 2 hingga akhir)
-            db_vectors = df.iloc[:, 2:].values.astype(np.float32)
-            
-            return ids, names, db_vectors
+            with telemetry.span("db.load_embeddings"):
+                return self.embedding_store.load()
 
         except Exception as e:
             print(f"DATABASE CRITICAL FAILURE: Load Embeddings Failed. Error: {e}")
@@ -74,36 +63,77 @@ class Database:
 
     # --- METHOD UNTUK MENYIMPAN HASIL OCR ---
     def save_ocr_result(self, data: dict):
-        """Menyimpan hasil OCR ke id_data.json"""
+        """Menyimpan hasil OCR ke record store (insert transaksional, tanpa rewrite file)."""
         id_number_raw = data.get('id_number')
         
         # --- FIX FINAL: Bersihkan ID saat digunakan sebagai key ---
         clean_id = str(id_number_raw).strip().upper() 
         # --------------------------------------------------------
 
-        # 1. Cek duplikasi (menggunakan clean_id)
-        if self.get_user_by_id(clean_id):
-            return False, f"ID {id_number_raw} sudah terdaftar."
-
-        # 2. Muat data lama
-        if os.path.exists(self.OCR_FILE):
-            with open(self.OCR_FILE, 'r') as f:
-                db_data = json.load(f)
-                
-            if not isinstance(db_data, dict):
-                 db_data = {}
-        else:
-            db_data = {}
-        
-        # 3. Tambahkan data baru (Gunakan clean_id sebagai KEY dan pastikan value ID di dalamnya juga bersih)
         # Penting: Update data['id_number'] agar value-nya juga bersih
         data['id_number'] = clean_id
-        db_data[clean_id] = data
-        
-        # 4. Simpan kembali
+
+        # Cek duplikasi + insert dalam satu transaksi (INSERT OR IGNORE pada PRIMARY KEY)
         try:
-            with open(self.OCR_FILE, 'w') as f:
-                json.dump(db_data, f, indent=4)
+            with telemetry.span("db.save_ocr_result"):
+                inserted = self.ocr_store.insert(clean_id, data)
+            if not inserted:
+                return False, f"ID {id_number_raw} sudah terdaftar."
             return True, "Data ID Card berhasil disimpan."
         except Exception as e:
-            return False, f"Gagal menyimpan data ke JSON: {str(e)}"
\ No newline at end of file
+            return False, f"Gagal menyimpan data ke database: {str(e)}"
+
+    def save_ocr_results(self, items: list) -> list:
+        """
+        Versi batch save_ocr_result: semua record ditulis dalam satu transaksi.
+        Mengembalikan list (success, message) dengan urutan yang sama dengan input.
+        Error database (mis. SQLite terkunci) di-raise, bukan dilaporkan sebagai duplikat,
+        agar pemanggil bisa mengulang batch tersebut.
+        """
+        records, results = {}, []
+        for data in items:
+            id_number_raw = data.get('id_number')
+            clean_id = str(id_number_raw).strip().upper()
+            data['id_number'] = clean_id
+
+            if clean_id in records:
+                results.append((clean_id, f"ID {id_number_raw} sudah terdaftar."))
+            else:
+                records[clean_id] = data
+                results.append((clean_id, None))
+
+        with telemetry.span("db.save_ocr_result", batch=len(records)):
+            inserted = set(self.ocr_store.insert_many(records))
+
+        output = []
+        for (clean_id, duplicate_msg), data in zip(results, items):
+            if duplicate_msg is None and clean_id in inserted:
+                output.append((True, "Data ID Card berhasil disimpan."))
+            else:
+                output.append((False, duplicate_msg or f"ID {clean_id} sudah terdaftar."))
+        return output
+
+    # --- METHOD UNTUK ONBOARDING (ID CARD + WAJAH SEKALIGUS) ---
+    def save_onboarding(self, data: dict, embedding_vector):
+        """
+        Simpan data OCR dan embedding wajah sebagai satu unit: jika embedding gagal ditulis,
+        record OCR yang baru saja masuk dihapus lagi sehingga tidak ada ID setengah terdaftar.
+        """
+        id_number_raw = data.get('id_number')
+        clean_id = str(id_number_raw).strip().upper()
+        data['id_number'] = clean_id
+
+        with telemetry.span("db.save_onboarding"):
+            try:
+                if not self.ocr_store.insert(clean_id, data):
+                    return False, f"ID {id_number_raw} sudah terdaftar."
+            except Exception as e:
+                return False, f"Gagal menyimpan data ke database: {str(e)}"
+
+            try:
+                self.embedding_store.append(clean_id, data.get('full_name', 'Unknown'), embedding_vector)
+            except Exception as e:
+                self.ocr_store.delete(clean_id)
+                return False, f"Gagal menyimpan embedding wajah: {str(e)}"
+
+        return True, "Data ID Card dan wajah berhasil disimpan."
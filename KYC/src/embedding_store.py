@@ -0,0 +1,257 @@
+import os
+import csv
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya lock antar-thread
+    fcntl = None
+
+# Format file matriks: header 16 byte lalu baris float32 dengan lebar tetap.
+# Header: MAGIC (8 byte) + dim (uint32) + padding (4 byte)
+MAGIC = b"KYCEMB01"
+HEADER_SIZE = 16
+DEFAULT_DIM = 512
+
+
+class EmbeddingStore:
+    """
+    Penyimpanan embedding biner: matriks float32 (memory-mapped) + sidecar index ID/Nama.
+    Baris ke-i di file matriks berpasangan dengan baris ke-i di file index.
+    """
+
+    def __init__(self, matrix_file: str, index_file: str, dim: int = DEFAULT_DIM):
+        self.MATRIX_FILE = matrix_file
+        self.INDEX_FILE = index_file
+        self.dim = dim
+        self._lock = threading.Lock()
+        # Lock antar-proses (worker pool 'process', enroll_faces.py di samping server)
+        self.LOCK_FILE = matrix_file + ".lock"
+        # (inode index, offset byte, jumlah baris) -- posisi index yang sudah dihitung
+        self._index_state = None
+
+        if os.path.exists(self.MATRIX_FILE) and os.path.getsize(self.MATRIX_FILE) >= HEADER_SIZE:
+            self.dim = self._read_header()
+
+    # --- HEADER ---
+    def _read_header(self) -> int:
+        with open(self.MATRIX_FILE, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+
+        if header[:8] != MAGIC:
+            raise ValueError(f"File {self.MATRIX_FILE} bukan embedding store yang valid.")
+
+        return int(np.frombuffer(header[8:12], dtype='<u4')[0])
+
+    def _ensure_files(self):
+        if not os.path.exists(self.MATRIX_FILE) or os.path.getsize(self.MATRIX_FILE) == 0:
+            header = MAGIC + np.array([self.dim, 0], dtype='<u4').tobytes()
+            with open(self.MATRIX_FILE, 'wb') as f:
+                f.write(header)
+
+        if not os.path.exists(self.INDEX_FILE):
+            open(self.INDEX_FILE, 'a').close()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.MATRIX_FILE) and os.path.getsize(self.MATRIX_FILE) >= HEADER_SIZE
+
+    def count(self) -> int:
+        """Jumlah baris lengkap di file matriks (dihitung dari ukuran file, O(1))."""
+        if not self.exists():
+            return 0
+        return (os.path.getsize(self.MATRIX_FILE) - HEADER_SIZE) // (self.dim * 4)
+
+    # --- APPEND ---
+    @contextmanager
+    def _locked(self):
+        """
+        Lock eksklusif untuk reconcile + tulis matriks + tulis index: threading.Lock di dalam
+        proses, flock pada file .lock antar proses. Tanpa flock, _reconcile() di satu proses
+        menganggap vektor yang sedang ditulis proses lain sebagai append terputus dan memotongnya.
+        """
+        folder = os.path.dirname(self.MATRIX_FILE)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._lock, open(self.LOCK_FILE, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _as_matrix(self, vectors) -> np.ndarray:
+        matrix = np.ascontiguousarray(vectors, dtype='<f4')
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Dimensi embedding {matrix.shape[1]} tidak sesuai store ({self.dim}).")
+        return matrix
+
+    def append(self, id_number, full_name, vector):
+        """Menambahkan satu embedding (O(1): hanya append ke akhir file)."""
+        self.append_many([id_number], [full_name], vector)
+
+    def append_many(self, ids: list, names: list, vectors):
+        """Menambahkan banyak embedding sekaligus dalam satu kali tulis."""
+        matrix = self._as_matrix(vectors)
+        if not (len(ids) == len(names) == matrix.shape[0]):
+            raise ValueError("Jumlah ID, nama dan vektor harus sama.")
+
+        with self._locked():
+            self._ensure_files()
+            rows = self._reconcile()
+
+            # Tulis vektor dulu, lalu index. Sisa append yang terpotong di tengah
+            # dibuang oleh _reconcile() sebelum append berikutnya.
+            with open(self.MATRIX_FILE, 'ab') as f:
+                f.write(matrix.tobytes())
+
+            with open(self.INDEX_FILE, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerows([[str(i), str(n)] for i, n in zip(ids, names)])
+
+            self._index_state = (self._index_state[0], os.path.getsize(self.INDEX_FILE), rows + matrix.shape[0])
+
+    def _reconcile(self) -> int:
+        """
+        Samakan file matriks dengan index sebelum menulis. Jika append sebelumnya terputus
+        (vektor sudah tertulis tapi baris index belum), vektor yatim dan baris index yang
+        belum lengkap dipotong; tanpa ini, append berikutnya dipasangkan dengan vektor yang salah.
+        Index hanya dibaca dari offset terakhir yang diketahui, jadi tetap O(1) per append.
+        Mengembalikan jumlah baris index yang lengkap.
+        """
+        inode = os.stat(self.INDEX_FILE).st_ino
+        index_size = os.path.getsize(self.INDEX_FILE)
+        state = self._index_state
+        if state is None or state[0] != inode or state[1] > index_size:
+            state = (inode, 0, 0)
+
+        ids, _, offset = self.read_index_from(state[1])
+        rows = state[2] + len(ids)
+        if index_size > offset:
+            os.truncate(self.INDEX_FILE, offset)
+
+        expected = HEADER_SIZE + rows * self.dim * 4
+        matrix_size = os.path.getsize(self.MATRIX_FILE)
+        if matrix_size > expected:
+            print(f"[EmbeddingStore] Membuang {matrix_size - expected} byte vektor tanpa index (append terputus).")
+            os.truncate(self.MATRIX_FILE, expected)
+        elif matrix_size < expected:
+            raise ValueError(f"Index {self.INDEX_FILE} berisi {rows} baris, tetapi matriks hanya "
+                             f"{(matrix_size - HEADER_SIZE) // (self.dim * 4)} baris.")
+
+        self._index_state = (inode, offset, rows)
+        return rows
+
+    def signature(self):
+        """Identitas file matriks (device, inode). Berubah jika file diganti, bukan di-append."""
+        if not self.exists():
+            return None
+        st = os.stat(self.MATRIX_FILE)
+        return (st.st_dev, st.st_ino)
+
+    # --- LOAD ---
+    def read_index_from(self, offset: int = 0, max_rows: int | None = None):
+        """
+        Membaca baris index mulai dari byte offset tertentu (untuk load inkremental).
+        Mengembalikan (ids, names, offset_baru). Baris terakhir yang belum lengkap diabaikan.
+        """
+        if not os.path.exists(self.INDEX_FILE):
+            return [], [], offset
+
+        with open(self.INDEX_FILE, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read()
+
+        lines = chunk.splitlines(keepends=True)
+        if lines and not lines[-1].endswith(b"\n"):
+            lines = lines[:-1]
+        if max_rows is not None:
+            lines = lines[:max_rows]
+
+        ids, names = [], []
+        for row in csv.reader(line.decode('utf-8') for line in lines):
+            if len(row) < 2:
+                continue
+            ids.append(row[0])
+            names.append(row[1])
+        return ids, names, offset + sum(len(line) for line in lines)
+
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        """Memmap read-only untuk baris [start, stop) tanpa membaca seluruh file."""
+        rows = max(0, stop - start)
+        if rows == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        return np.memmap(
+            self.MATRIX_FILE, dtype='<f4', mode='r',
+            offset=HEADER_SIZE + start * self.dim * 4, shape=(rows, self.dim)
+        )
+
+    def load_index(self):
+        ids, names = [], []
+        if not os.path.exists(self.INDEX_FILE):
+            return ids, names
+
+        with open(self.INDEX_FILE, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if len(row) < 2:
+                    continue
+                ids.append(row[0])
+                names.append(row[1])
+        return ids, names
+
+    def load(self):
+        """
+        Memuat (ids, names, db_vectors). db_vectors adalah np.memmap read-only (zero-copy).
+        """
+        if not self.exists():
+            return [], [], np.array([])
+
+        ids, names = self.load_index()
+        rows = min(len(ids), self.count())
+        if rows == 0:
+            return [], [], np.array([])
+
+        db_vectors = np.memmap(
+            self.MATRIX_FILE, dtype='<f4', mode='r',
+            offset=HEADER_SIZE, shape=(rows, self.dim)
+        )
+        return ids[:rows], names[:rows], db_vectors
+
+
+def migrate_csv(csv_file: str, store: EmbeddingStore, chunk_size: int = 10000) -> int:
+    """
+    Konversi embeddings.csv lama (id, nama, v0..vN tanpa header) ke EmbeddingStore.
+    Mengembalikan jumlah baris yang dimigrasi.
+    """
+    if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
+        return 0
+
+    total = 0
+    ids, names, vectors = [], [], []
+
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            ids.append(row[0].strip())
+            names.append(row[1].strip())
+            vectors.append(np.asarray(row[2:], dtype=np.float32))
+
+            if len(ids) >= chunk_size:
+                store.append_many(ids, names, np.vstack(vectors))
+                total += len(ids)
+                ids, names, vectors = [], [], []
+
+    if ids:
+        store.append_many(ids, names, np.vstack(vectors))
+        total += len(ids)
+
+    return total
@@ -1,18 +1,55 @@
+import copy
 import torch
 import numpy as np
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
 from facenet_pytorch import InceptionResnetV1, MTCNN
+from .model_runtime import RUNTIMES, EXPORT_DIR, EMBEDDING_NET, MTCNN_NETS, load_module
+from . import telemetry
 from PIL import Image
 import warnings
+import time
+import os
+import json
+
+# Naikkan jika format artefak model berubah (artefak lama otomatis diabaikan)
+MODEL_ARTIFACT_VERSION = 2
+
+# Mode kuantisasi yang didukung:
+# - none      : Float32 murni
+# - dynamic   : bobot Linear int8, aktivasi float (tanpa kalibrasi)
+# - fx_static : FX graph mode static quantization (Conv/Linear int8, perlu kalibrasi)
+QUANTIZATION_MODES = ("none", "dynamic", "fx_static")
 
 # Suppress warning agar log bersih
 warnings.filterwarnings("ignore", category=UserWarning)
 
+def _as_rgb(image):
+    """
+    MTCNN selalu diberi PIL Image RGB. Untuk ndarray, facenet_pytorch me-resize crop 160x160 dengan
+    cv2.INTER_AREA (bukan PIL BILINEAR) sehingga embedding bergeser dari galeri yang di-enroll lewat
+    PIL. Image.fromarray hanya menyalin piksel (tanpa decode ulang).
+    """
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    if image.mode == 'RGB':
+        return image
+    return image.convert('RGB')
+
 class FaceEngine:
-    def __init__(self):
+    def __init__(self, quantization: str = "none", runtime: str = "eager", export_dir: str = EXPORT_DIR):
         print("[FaceEngine] Initializing...")
         self.device = torch.device('cpu')
+
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Mode kuantisasi '{quantization}' tidak dikenal. Pilih: {QUANTIZATION_MODES}")
+        if runtime not in RUNTIMES:
+            raise ValueError(f"Runtime '{runtime}' tidak dikenal. Pilih: {RUNTIMES}")
+        self.quantization = quantization
+        self.runtime = "eager"
         
         # --- LOGIKA SAFETY SWITCH ---
+        self.is_quantized = False
         self.can_quantize = False
         self.backend = None
         
@@ -20,16 +57,14 @@ class FaceEngine:
         supported_engines = torch.backends.quantized.supported_engines
         print(f"[FaceEngine] Supported Quantization Engines: {supported_engines}")
 
-        # Prioritas Backend
-        if 'qnnpack' in supported_engines:
-            self.backend = 'qnnpack'
-            # Kita set engine, tapi tetap siap fallback jika crash
-            torch.backends.quantized.engine = 'qnnpack'
-            self.can_quantize = True
-        elif 'fbgemm' in supported_engines:
-            self.backend = 'fbgemm'
-            torch.backends.quantized.engine = 'fbgemm'
-            self.can_quantize = True
+        # Prioritas Backend: x86/fbgemm untuk CPU Intel/AMD, qnnpack untuk ARM
+        for engine in ('x86', 'fbgemm', 'qnnpack'):
+            if engine in supported_engines:
+                self.backend = engine
+                # Kita set engine, tapi tetap siap fallback jika crash
+                torch.backends.quantized.engine = engine
+                self.can_quantize = True
+                break
         else:
             print("[FaceEngine] ⚠️ No quantization backend supported. Using Float32.")
             self.can_quantize = False
@@ -43,68 +78,187 @@ class FaceEngine:
 
         # 2. InceptionResnetV1 (Feature Extractor)
         self.model = InceptionResnetV1(pretrained='vggface2').eval().to(self.device)
-        
+
+        # 3. Runtime hasil export (TorchScript/ONNX), fallback ke eager jika artefak tidak ada
+        if runtime != "eager":
+            self._load_runtime(runtime, export_dir)
+
+    def _load_runtime(self, runtime: str, export_dir: str):
+        exported = load_module(export_dir, EMBEDDING_NET, runtime, self.device)
+        if exported is None:
+            print(f"[FaceEngine] ⚠️ {runtime} artifact not found in {export_dir}. Falling back to eager.")
+            return
+
+        self.model = exported
+        self.runtime = runtime
+
+        # Stage MTCNN bersifat opsional: tiap stage yang ada artefaknya diganti
+        for name in MTCNN_NETS:
+            net = load_module(export_dir, name, runtime, self.device)
+            if net is not None:
+                setattr(self.mtcnn, name, net)
+
+        print(f"[FaceEngine] Using {runtime} runtime from {export_dir}.")
+
+    @property
+    def needs_calibration(self) -> bool:
+        return self.can_quantize and self.runtime == "eager" and self.quantization == "fx_static"
+
     def quantize_model(self, calibration_images: list):
         """
-        Mencoba melakukan Static Quantization.
-        Jika gagal (karena Windows/Arsitektur Model), otomatis revert ke Float32.
+        Kuantisasi model sesuai `self.quantization` (dynamic / fx_static).
+        Jika gagal, model Float32 tetap dipakai.
         """
-        if not self.can_quantize:
+        if not self.can_quantize or self.quantization == "none":
             print("[FaceEngine] Skipping quantization. Running in Float32 mode.")
             return
 
-        if not calibration_images:
+        if self.runtime != "eager":
+            # Artefak export adalah model Float32; kuantisasi hanya untuk runtime eager
+            print(f"[FaceEngine] Skipping quantization for {self.runtime} runtime.")
             return
 
-        print(f"[FaceEngine] Attempting quantization with {len(calibration_images)} samples...")
-        
+        float_model = self.model.eval()
+
         try:
-            # Simpan state asli model (untuk restore jika gagal)
-            original_state = self.model.state_dict()
-            
-            self.model.eval()
-            
-            # [FIX] Hapus freeze_bn_stats yang bermasalah pada InceptionResnet
-            # self.model.apply(torch.nn.intrinsic.modules.fused.bn_relu.freeze_bn_stats) <-- DIHAPUS
-            
-            self.model.qconfig = torch.quantization.get_default_qconfig(self.backend)
-            torch.quantization.prepare(self.model, inplace=True)
+            if self.quantization == "dynamic":
+                self.model = quantize_dynamic(copy.deepcopy(float_model), {torch.nn.Linear}, dtype=torch.qint8)
+                self.is_quantized = True
+                print("[FaceEngine] Dynamic Quantization Complete (Linear Int8).")
+                return
+
+            # --- FX GRAPH MODE STATIC QUANTIZATION ---
+            crops = []
+            for img in calibration_images:
+                try:
+                    if img.mode != 'RGB': img = img.convert('RGB')
+                    tensor, _, _ = self.detect_face(img)
+                    if tensor is not None:
+                        crops.append(tensor)
+                except:
+                    pass
+
+            if not crops:
+                print("[FaceEngine] ⚠️ No faces found for calibration. Running in Float32 mode.")
+                return
 
-            # Calibration Loop
+            print(f"[FaceEngine] FX static quantization, calibrating with {len(crops)} faces...")
+            example = torch.zeros(1, 3, 160, 160)
+            prepared = prepare_fx(copy.deepcopy(float_model), get_default_qconfig_mapping(self.backend), (example,))
+
+            # Calibration Loop (observer mengumpulkan rentang aktivasi)
             with torch.no_grad():
-                for img in calibration_images:
-                    try:
-                        if img.mode != 'RGB': img = img.convert('RGB')
-                        tensor = self.mtcnn(img)
-                        if tensor is not None:
-                            self.model(tensor.unsqueeze(0).to(self.device))
-                    except:
-                        pass
-
-            torch.quantization.convert(self.model, inplace=True)
+                for start in range(0, len(crops), 16):
+                    prepared(torch.stack(crops[start:start + 16]).to(self.device))
+
+            self.model = convert_fx(prepared).eval()
+            self.is_quantized = True
             print("[FaceEngine] Quantization Complete (Int8 Mode).")
             
         except Exception as e:
             print(f"[FaceEngine] ⚠️ Quantization Failed/Unstable: {e}")
             print("[FaceEngine] Reverting to Standard Float32 Model...")
-            
-            # Re-init model baru yang bersih (Float32)
-            self.model = InceptionResnetV1(pretrained='vggface2').eval().to(self.device)
+            self.model = float_model
+            self.is_quantized = False
+
+    # --- ARTEFAK MODEL (COLD START CEPAT) ---
+    def save_model_artifact(self, path: str, fingerprint: str):
+        """
+        Simpan hasil kuantisasi: model int8 di-trace ke TorchScript + manifest JSON.
+        Jika kuantisasi gagal, hanya manifest (mode float32) yang disimpan agar
+        kalibrasi tidak diulang pada boot berikutnya.
+        """
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        mode = self.quantization if self.is_quantized else "float32"
+        try:
+            if self.is_quantized:
+                example = torch.zeros(1, 3, 160, 160)
+                with torch.no_grad():
+                    traced = torch.jit.trace(self.model, example)
+                torch.jit.save(traced, path)
+
+            manifest = {
+                "version": MODEL_ARTIFACT_VERSION,
+                "fingerprint": fingerprint,
+                "mode": mode,
+                "backend": self.backend,
+                "torch": torch.__version__,
+            }
+            with open(path + ".json", 'w') as f:
+                json.dump(manifest, f, indent=4)
+            print(f"[FaceEngine] Model artifact saved ({mode}) -> {path}")
+        except Exception as e:
+            print(f"[FaceEngine] ⚠️ Failed to save model artifact: {e}")
+
+    def load_model_artifact(self, path: str, fingerprint: str) -> bool:
+        """Muat artefak jika versi & fingerprint input sama. Mengembalikan True jika dipakai."""
+        manifest_path = path + ".json"
+        if not os.path.exists(manifest_path):
+            return False
+
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+
+            if manifest.get("version") != MODEL_ARTIFACT_VERSION or manifest.get("fingerprint") != fingerprint:
+                print("[FaceEngine] Model artifact is stale. Re-calibrating...")
+                return False
+
+            if manifest.get("mode") != "float32":
+                if self.backend:
+                    torch.backends.quantized.engine = self.backend
+                self.model = torch.jit.load(path, map_location=self.device).eval()
+                self.is_quantized = True
 
-    def extract_embedding(self, image: Image.Image) -> dict:
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+            print(f"[FaceEngine] Reusing model artifact ({manifest.get('mode')}) from {path}")
+            return True
+
+        except Exception as e:
+            print(f"[FaceEngine] ⚠️ Failed to load model artifact: {e}")
+            return False
 
-        boxes, _ = self.mtcnn.detect(image)
-    
-    # Ambil box pertama yang terdeteksi, jika ada (konversi ke list Python)
-        face_bbox = boxes[0].tolist() if boxes is not None and len(boxes) > 0 else None
-    # ----------------------------------------
+    def warmup(self):
+        """Satu inferensi dummy (detektor + embedding) agar request pertama tidak lambat."""
+        dummy = Image.fromarray(np.zeros((160, 160, 3), dtype=np.uint8))
+        self.mtcnn.detect(dummy)
+        with torch.no_grad():
+            self.model(torch.zeros(1, 3, 160, 160).to(self.device))
+
+    def detect_face(self, image: Image.Image):
+        """
+        Satu kali MTCNN cascade: mengembalikan (crop 160x160 ter-align, probabilitas (float), bbox).
+        Setara dengan mtcnn.detect() + mtcnn(image) tetapi P/R/O-Net hanya dijalankan sekali.
+        """
+        boxes, probs, points = self.mtcnn.detect(image, landmarks=True)
 
+        # Pilih wajah yang sama dengan yang dipilih MTCNN.forward (keep_all=False)
+        boxes, probs, points = self.mtcnn.select_boxes(
+            boxes, probs, points, image, method=self.mtcnn.selection_method
+        )
+        if boxes is None:
+            return None, None, None
+
+        img_cropped = self.mtcnn.extract(image, boxes, None)
+        face_bbox = boxes[0].tolist()
+        return img_cropped, float(np.ravel(probs)[0]), face_bbox
+
+    def extract_embedding(self, image) -> dict:
+        """
+        image: PIL Image atau array RGB uint8 (H, W, 3) dari image_decode.decode_image.
+        Array dibungkus menjadi PIL Image agar crop di-resize sama seperti saat enrollment.
+        """
+        image = _as_rgb(image)
+
+        t0 = time.perf_counter()
         try:
-            img_cropped, prob = self.mtcnn(image, return_prob=True)
+            with telemetry.span("face.detect"):
+                img_cropped, prob, face_bbox = self.detect_face(image)
         except:
-             return { "found": False, "embedding": None, "confidence": 0, "message": "Detection Error"}
+             return { "found": False, "embedding": None, "confidence": 0.0, "message": "Detection Error"}
+        t1 = time.perf_counter()
 
         if img_cropped is None:
             return {
@@ -116,13 +270,107 @@ class FaceEngine:
 
         img_tensor = img_cropped.unsqueeze(0).to(self.device)
         
-        with torch.no_grad():
+        with torch.no_grad(), telemetry.span("face.embed"):
             embedding = self.model(img_tensor)
+        t2 = time.perf_counter()
         
         return {
             "found": True,
             "embedding": embedding.cpu().numpy().flatten(),
             "confidence": prob,
             "face_bbox": face_bbox,
+            "timings_ms": {"detect": (t1 - t0) * 1000, "embed": (t2 - t1) * 1000},
             "message": "Success"
-        }
\ No newline at end of file
+        }
+
+    def detect_faces_batch(self, images: list) -> list:
+        """
+        Deteksi wajah untuk banyak gambar. MTCNN hanya bisa mem-batch gambar berukuran sama,
+        jadi gambar dikelompokkan per ukuran. Mengembalikan list (crop, prob, bbox) atau
+        None jika terjadi error deteksi pada gambar tersebut.
+        """
+        detections = [None] * len(images)
+
+        groups = {}
+        for i, img in enumerate(images):
+            size = img.shape[:2] if isinstance(img, np.ndarray) else img.size
+            groups.setdefault(size, []).append(i)
+
+        for indices in groups.values():
+            group = [images[i] for i in indices]
+            try:
+                boxes, probs, points = self.mtcnn.detect(group, landmarks=True)
+                boxes, probs, points = self.mtcnn.select_boxes(
+                    boxes, probs, points, group, method=self.mtcnn.selection_method
+                )
+                crops = self.mtcnn.extract(group, boxes, None)
+
+                for j, i in enumerate(indices):
+                    if boxes[j] is None:
+                        detections[i] = (None, None, None)
+                    else:
+                        detections[i] = (crops[j], float(np.ravel(probs[j])[0]), boxes[j][0].tolist())
+            except Exception:
+                # Fallback per gambar agar satu gambar rusak tidak menggagalkan seluruh batch
+                for i in indices:
+                    try:
+                        detections[i] = self.detect_face(images[i])
+                    except Exception:
+                        detections[i] = None
+
+        return detections
+
+    def extract_embeddings_batch(self, images: list, batch_size: int = 32) -> list:
+        """
+        Versi batch dari extract_embedding: deteksi wajah lintas batch, crop di-stack menjadi
+        satu tensor lalu InceptionResnetV1 dijalankan per `batch_size` gambar.
+        Format hasil per gambar sama dengan extract_embedding (termasuk kasus tidak ditemukan).
+        """
+        images = [_as_rgb(img) for img in images]
+
+        t0 = time.perf_counter()
+        with telemetry.span("face.detect", batch=len(images)):
+            detections = self.detect_faces_batch(images)
+        t1 = time.perf_counter()
+
+        results = [None] * len(images)
+        found = []
+        for i, det in enumerate(detections):
+            if det is None:
+                results[i] = { "found": False, "embedding": None, "confidence": 0.0, "message": "Detection Error"}
+            elif det[0] is None:
+                results[i] = {
+                    "found": False,
+                    "embedding": None,
+                    "confidence": 0.0,
+                    "message": "Wajah tidak terdeteksi"
+                }
+            else:
+                found.append(i)
+
+        embeddings = {}
+        with torch.no_grad(), telemetry.span("face.embed", batch=len(found)):
+            for start in range(0, len(found), batch_size):
+                chunk = found[start:start + batch_size]
+                batch = torch.stack([detections[i][0] for i in chunk]).to(self.device)
+                output = self.model(batch).cpu().numpy()
+                for i, emb in zip(chunk, output):
+                    embeddings[i] = emb
+        t2 = time.perf_counter()
+
+        # Waktu dibagi rata per gambar agar sebanding dengan extract_embedding
+        n = max(len(images), 1)
+        timings = {"detect": (t1 - t0) * 1000 / n, "embed": (t2 - t1) * 1000 / max(len(found), 1)}
+
+        for i in found:
+            _, prob, face_bbox = detections[i]
+            results[i] = {
+                "found": True,
+                "embedding": embeddings[i].flatten(),
+                "confidence": prob,
+                "face_bbox": face_bbox,
+                "timings_ms": dict(timings),
+                "message": "Success"
+            }
+
+        return results
@@ -0,0 +1,349 @@
+import hashlib
+import threading
+import numpy as np
+
+from .embedding_store import EmbeddingStore
+from .ann_index import ExactIndex, select_top_k
+from .vector_codec import CompressedMatrix
+from . import telemetry
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normalisasi L2 per baris (float32). Vektor nol dibiarkan nol."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class GalleryCache:
+    """
+    Galeri embedding yang resident di memori sebagai matriks float32 ter-normalisasi.
+    Hanya baris baru di store yang dibaca ulang; reload penuh terjadi jika file diganti.
+    Pencarian didelegasikan ke `index` (ExactIndex / IVFIndex dari ann_index).
+
+    compression='float16' / 'int8' menyimpan galeri resident sebagai kode terkompresi
+    (vector_codec). Coarse scan berjalan di atas kode, lalu `rerank` kandidat teratas
+    dinilai ulang dengan vektor float32 dari store (memmap, tidak resident).
+
+    sharded (ShardedSearcher) membagi exact scan galeri besar ke beberapa proses worker.
+    """
+
+    def __init__(self, store: EmbeddingStore, initial_capacity: int = 1024,
+                 index=None, index_file: str | None = None,
+                 compression: str = "float32", rerank: int = 32, sharded=None):
+        self.store = store
+        self.sharded = sharded
+        self.compression = compression
+        self.rerank = rerank
+        self.index = index if index is not None else ExactIndex()
+        self.index_file = index_file
+        self._exact = ExactIndex()
+        self._lock = threading.Lock()
+        self._capacity = initial_capacity
+
+        self.ids: list = []
+        self.names: list = []
+        self._rows_by_id: dict = {}  # ID Number -> baris galeri (untuk verifikasi 1:1)
+        self._codes = None
+        self._full = None  # memmap float32 untuk re-ranking (hanya jika terkompresi)
+        if compression == "float32":
+            self._matrix = np.empty((initial_capacity, store.dim), dtype=np.float32)
+        else:
+            self._matrix = np.empty((0, store.dim), dtype=np.float32)
+            self._codes = CompressedMatrix(compression, store.dim, initial_capacity)
+        self.size = 0
+
+        self._signature = None
+        self._index_offset = 0
+        self._generation = 0         # naik setiap reload penuh; rebuild dari generasi lama dibuang
+        self._rebuild_thread = None
+
+        if self.index_file and self.index.load(self.index_file):
+            if self.index.source is not None and self.index.source == self._index_source(self.index.ntotal):
+                print(f"[Gallery] Loaded {self.index.name} index from {self.index_file}.")
+            else:
+                # Store diganti / dimensi berbeda / file lama tanpa identitas -> inverted list basi
+                print(f"[Gallery] ⚠️ {self.index_file} tidak cocok dengan embedding store, index dibangun ulang.")
+                self.index.reset()
+
+        self.refresh()
+
+    @property
+    def matrix(self):
+        """View baris yang terisi (tanpa copy), atau CompressedMatrix jika galeri terkompresi."""
+        if self._codes is not None:
+            return self._codes
+        return self._matrix[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        """Memori resident vektor galeri (tanpa ids/names)."""
+        return self.matrix.nbytes
+
+    def _reset(self, reset_index: bool = True):
+        self.ids, self.names = [], []
+        self._rows_by_id = {}
+        self.size = 0
+        self._full = None
+        if self._codes is not None:
+            self._codes.reset()
+        self._index_offset = 0
+        self._signature = None
+        self._generation += 1
+        if reset_index:
+            self.index.reset()
+
+    def _append_rows(self, ids: list, names: list, vectors: np.ndarray):
+        n = len(ids)
+        if n == 0:
+            return
+
+        needed = self.size + n
+        if self._codes is not None:
+            self._codes.append(l2_normalize(vectors))
+        elif needed > self._capacity:
+            # Gandakan kapasitas agar append tetap amortized O(1)
+            new_capacity = max(needed, self._capacity * 2)
+            grown = np.empty((new_capacity, self.store.dim), dtype=np.float32)
+            grown[:self.size] = self._matrix[:self.size]
+            self._matrix = grown
+            self._capacity = new_capacity
+
+        if self._codes is None:
+            self._matrix[self.size:needed] = l2_normalize(vectors)
+        for row, id_number in enumerate(ids, start=self.size):
+            self._rows_by_id.setdefault(str(id_number).strip().upper(), []).append(row)
+        self.ids.extend(ids)
+        self.names.extend(names)
+        self.size = needed
+        self._sync_index()
+
+    def _sync_index(self):
+        if self.index.ntotal > self.size:
+            self.index.reset()
+        if self.index.ntotal < self.size:
+            self.index.add(self.matrix[self.index.ntotal:self.size])
+
+        if self.index.needs_rebuild() and not self.rebuilding:
+            # k-means tidak dijalankan di jalur request: index baru dibangun di thread lain
+            # sementara pencarian tetap memakai index lama, lalu ditukar saat selesai.
+            self._rebuild_thread = threading.Thread(
+                target=self._rebuild_index,
+                args=(self._generation, self.size, self.matrix, self._index_source(self.size)),
+                daemon=True,
+            )
+            self._rebuild_thread.start()
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+
+    def _rebuild_index(self, generation: int, n: int, vectors, source: dict | None):
+        try:
+            print(f"[Gallery] Building {self.index.name} index over {n} embeddings (background)...")
+            index = self.index.fresh()
+            index.build(vectors, n)
+            if self.index_file and generation == self._generation:
+                index.save(self.index_file, source)
+
+            with self._lock:
+                if generation != self._generation:
+                    return  # Galeri di-reload selama build -> hasil dibuang
+                # Kejar baris yang masuk selama build, lalu tukar
+                if index.ntotal < self.size:
+                    index.add(self.matrix[index.ntotal:self.size])
+                self.index = index
+            print(f"[Gallery] {index.name} index over {n} embeddings ready.")
+        except Exception as e:
+            print(f"[Gallery] ⚠️ Index rebuild failed: {e}")
+
+    def wait_for_index(self):
+        """Tunggu rebuild index di background selesai (untuk benchmark / skrip offline)."""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join()
+
+    def _index_source(self, n: int) -> dict | None:
+        """
+        Identitas galeri untuk `n` baris pertama: signature file, dimensi, jumlah baris dan
+        sidik jari vektor pertama & terakhir. Dipakai untuk menolak index persisten yang basi.
+        """
+        signature = self.store.signature()
+        if signature is None or n <= 0 or self.store.count() < n:
+            return None
+        rows = self.store.read_rows(0, n)
+        digest = hashlib.sha1(rows[0].tobytes() + rows[n - 1].tobytes()).hexdigest()
+        return {"signature": list(signature), "dim": self.store.dim, "ntotal": n, "fingerprint": digest}
+
+    def _sync_locked(self):
+        signature = self.store.signature()
+        if signature is None:
+            self._reset()
+            return
+
+        # File diganti (migrasi ulang / restore) -> reload penuh
+        if signature != self._signature:
+            # Index yang dimuat dari disk hanya dipertahankan saat load pertama
+            self._reset(reset_index=self._signature is not None)
+            self.store = EmbeddingStore(self.store.MATRIX_FILE, self.store.INDEX_FILE)
+            self._signature = signature
+            if self._codes is not None and self._codes.dim != self.store.dim:
+                self._codes = CompressedMatrix(self.compression, self.store.dim, self._capacity)
+            elif self._codes is None and self._matrix.shape[1] != self.store.dim:
+                self._matrix = np.empty((self._capacity, self.store.dim), dtype=np.float32)
+
+        if self.store.count() <= self.size:
+            return
+
+        # Baca hanya ekor file yang belum ada di cache
+        pending = self.store.count() - self.size
+        ids, names, offset = self.store.read_index_from(self._index_offset, max_rows=pending)
+        if not ids:
+            return
+
+        vectors = self.store.read_rows(self.size, self.size + len(ids))
+        self._append_rows(ids, names, vectors)
+        self._index_offset = offset
+
+    def refresh(self):
+        """Sinkronkan cache dengan file di disk (misal ditulis worker lain)."""
+        with self._lock, telemetry.span("gallery.refresh"):
+            self._sync_locked()
+
+    def add(self, id_number: str, full_name: str, vector):
+        """
+        Tambah baris yang baru saja disimpan ke store langsung ke cache.
+        Jika store juga berisi tulisan worker lain, cache disinkronkan dari disk.
+        """
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            if self.store.signature() == self._signature and self.store.count() == self.size + 1:
+                _, _, offset = self.store.read_index_from(self._index_offset, max_rows=1)
+                self._append_rows([id_number], [full_name], vector)
+                self._index_offset = offset
+            else:
+                self._sync_locked()
+
+    def score_identity(self, query_vec, id_number: str) -> np.ndarray:
+        """
+        Cosine similarity query terhadap embedding milik satu ID saja (verifikasi 1:1).
+        Baris diambil lewat index ID -> baris, jadi biaya tidak bergantung ukuran galeri.
+        Mengembalikan array kosong jika ID belum punya wajah terdaftar.
+        """
+        self.refresh()
+
+        with self._lock:
+            rows = self._rows_by_id.get(str(id_number).strip().upper())
+            if not rows:
+                return np.array([], dtype=np.float32)
+            query = l2_normalize(np.asarray(query_vec, dtype=np.float32).reshape(-1))
+            if self._codes is not None:
+                # Hanya beberapa baris -> langsung pakai vektor float32 presisi penuh
+                return l2_normalize(self._full_vectors()[rows]) @ query
+            return self._matrix[rows] @ query
+
+    # --- RE-RANKING (galeri terkompresi) ---
+    def _full_vectors(self) -> np.ndarray:
+        """Memmap float32 semua baris galeri di store (dibuka ulang hanya jika galeri bertambah)."""
+        if self._full is None or self._full.shape[0] < self.size:
+            self._full = self.store.read_rows(0, self.size)
+        return self._full
+
+    def _use_sharded(self, exact: bool) -> bool:
+        # Sharding hanya menggantikan exact scan (skor float32 langsung dari memmap store)
+        return (self.sharded is not None and self.size >= self.sharded.min_rows
+                and (exact or isinstance(self.index, ExactIndex)))
+
+    def _candidates(self, top_k: int) -> int:
+        return max(top_k, self.rerank)
+
+    def _rerank(self, query: np.ndarray, coarse, top_k: int):
+        """Nilai ulang kandidat coarse scan dengan cosine float32 (baris dibaca dari memmap)."""
+        idx, scores = coarse
+        if self.rerank <= 0 or len(idx) == 0:
+            return idx[:top_k], scores[:top_k]
+
+        exact_scores = l2_normalize(self._full_vectors()[idx]) @ query
+        order = select_top_k(exact_scores, top_k)
+        return idx[order], exact_scores[order]
+
+    def _resolve(self, result):
+        """(indices, scores) -> (indices, scores, ids, names). Harus dipanggil saat lock dipegang."""
+        idx, scores = result
+        return idx, scores, [self.ids[i] for i in idx], [self.names[i] for i in idx]
+
+    def search(self, query_vec, top_k: int = 1, exact: bool = False):
+        """
+        Top-k cosine similarity terhadap galeri ter-normalisasi.
+        exact=True memaksa brute-force scan (satu perkalian matriks-vektor).
+        Mengembalikan (indices, scores, ids, names) terurut menurun; ids/names diambil di bawah
+        lock yang sama dengan pencarian sehingga tetap konsisten walau galeri di-reload bersamaan.
+        """
+        self.refresh()
+
+        with self._lock:
+            if self.size == 0:
+                return np.array([], dtype=np.int64), np.array([], dtype=np.float32), [], []
+            return self._resolve(self._search_locked(query_vec, top_k, exact))
+
+    def _search_locked(self, query_vec, top_k: int, exact: bool):
+        query = l2_normalize(np.asarray(query_vec, dtype=np.float32).reshape(-1))
+        if self._use_sharded(exact):
+            return self.sharded.search(query, top_k, self.size)[0]
+
+        if self._codes is not None:
+            if exact or isinstance(self.index, ExactIndex):
+                scores = self._codes.scores(query)[:, 0]
+                idx = select_top_k(scores, self._candidates(top_k))
+                coarse = (idx, scores[idx])
+            else:
+                coarse = self.index.search(query, self.matrix, self._candidates(top_k))
+            return self._rerank(query, coarse, top_k)
+
+        if exact:
+            self._exact.ntotal = self.size
+            return self._exact.search(query, self.matrix, top_k)
+        return self.index.search(query, self.matrix, top_k)
+
+    def search_batch(self, query_vecs, top_k: int = 1, exact: bool = False):
+        """
+        Top-k untuk banyak query sekaligus. Dengan exact scan, seluruh batch dinilai dalam
+        satu perkalian matriks (galeri @ queries.T). Mengembalikan list (indices, scores, ids, names).
+        """
+        self.refresh()
+
+        with self._lock:
+            queries = l2_normalize(np.asarray(query_vecs, dtype=np.float32).reshape(len(query_vecs), -1))
+            if self.size == 0:
+                empty = (np.array([], dtype=np.int64), np.array([], dtype=np.float32), [], [])
+                return [empty for _ in range(queries.shape[0])]
+            return [self._resolve(r) for r in self._search_batch_locked(queries, top_k, exact)]
+
+    def _search_batch_locked(self, queries: np.ndarray, top_k: int, exact: bool):
+        if self._use_sharded(exact):
+            return self.sharded.search(queries, top_k, self.size)
+
+        if self._codes is not None:
+            return self._search_batch_compressed(queries, top_k, exact)
+
+        if not exact and not isinstance(self.index, ExactIndex):
+            return [self.index.search(q, self.matrix, top_k) for q in queries]
+
+        results = []
+        for scores in queries @ self.matrix.T:
+            idx = select_top_k(scores, top_k)
+            results.append((idx, scores[idx]))
+        return results
+
+    def _search_batch_compressed(self, queries: np.ndarray, top_k: int, exact: bool):
+        k = self._candidates(top_k)
+        if not exact and not isinstance(self.index, ExactIndex):
+            return [self._rerank(q, self.index.search(q, self.matrix, k), top_k) for q in queries]
+
+        # Satu coarse scan (per chunk) untuk seluruh batch, lalu re-rank per query
+        results = []
+        for q, scores in zip(queries, self._codes.scores(queries).T):
+            idx = select_top_k(scores, k)
+            results.append(self._rerank(q, (idx, scores[idx]), top_k))
+        return results
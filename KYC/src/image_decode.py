@@ -0,0 +1,56 @@
+import io
+import numpy as np
+from PIL import Image, ImageOps
+
+# Sisi terpanjang maksimum per konsumen (piksel).
+# MTCNN tidak butuh 12 MP untuk wajah selfie; OCR butuh resolusi lebih tinggi
+# agar teks kartu tetap terbaca setelah warp ke ukuran kanonik (card_detector).
+FACE_MAX_SIDE = 1024
+OCR_MAX_SIDE = 2048
+
+# Tag EXIF Orientation yang menukar lebar/tinggi (rotasi 90/270 derajat)
+_EXIF_ORIENTATION = 0x0112
+_SWAPS_AXES = (5, 6, 7, 8)
+
+
+def decode_image(contents: bytes, max_side: int):
+    """
+    Decode upload sekali menjadi satu array RGB uint8 (H, W, 3) untuk FaceEngine dan OCREngine.
+    OCREngine memakainya langsung; FaceEngine membungkusnya kembali menjadi PIL Image
+    (salin piksel, tanpa decode ulang) agar resampling crop MTCNN sama dengan enrollment.
+    - JPEG di-decode langsung pada skala kecil (draft mode, DCT scaling 1/2..1/8)
+    - Orientasi EXIF diterapkan (foto HP potret tidak lagi terbaca miring)
+    - Sisi terpanjang dibatasi ke `max_side`
+    Mengembalikan (array, scale) dengan scale = ukuran hasil / ukuran asli (setelah orientasi),
+    untuk memetakan koordinat (mis. face_bbox) kembali ke gambar asli.
+    """
+    image = Image.open(io.BytesIO(contents))
+    orientation = image.getexif().get(_EXIF_ORIENTATION, 1)
+
+    width, height = image.size
+    if orientation in _SWAPS_AXES:
+        width, height = height, width
+    original_side = max(width, height)
+
+    if image.format == "JPEG" and original_side > max_side:
+        # draft() memilih skala DCT terbesar yang hasilnya masih >= ukuran yang diminta
+        ratio = max_side / original_side
+        image.draft("RGB", (int(image.size[0] * ratio) + 1, int(image.size[1] * ratio) + 1))
+
+    if orientation != 1:
+        ImageOps.exif_transpose(image, in_place=True)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    # Buffer PIL -> ndarray (read-only, dipakai bersama oleh engine)
+    array = np.asarray(image)
+    return array, array.shape[1] / float(width)
+
+
+def scale_bbox(bbox, scale: float):
+    """Petakan bbox [x1, y1, x2, y2] dari gambar hasil decode ke koordinat gambar asli."""
+    if bbox is None or scale == 1.0:
+        return bbox
+    return [float(v) / scale for v in bbox]
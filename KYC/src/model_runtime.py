@@ -0,0 +1,107 @@
+import os
+import numpy as np
+import torch
+
+# onnxruntime opsional: hanya dibutuhkan untuk runtime 'onnx'
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+RUNTIMES = ("eager", "torchscript", "onnx")
+EXPORT_DIR = "models/export"
+
+# Nama file artefak per jaringan: (nama, contoh input untuk export)
+EMBEDDING_NET = "inception_resnet_v1"
+MTCNN_NETS = {
+    "pnet": (1, 3, 120, 160),
+    "rnet": (1, 3, 24, 24),
+    "onet": (1, 3, 48, 48),
+}
+
+
+def artifact_path(export_dir: str, name: str, runtime: str) -> str:
+    ext = "onnx" if runtime == "onnx" else "pt"
+    return os.path.join(export_dir, f"{name}.{ext}")
+
+
+class OnnxModule(torch.nn.Module):
+    """Membungkus sesi onnxruntime agar bisa dipanggil seperti nn.Module (input/output torch.Tensor)."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def forward(self, x: torch.Tensor):
+        outputs = self.session.run(None, {self.input_name: x.detach().cpu().numpy().astype(np.float32)})
+        tensors = tuple(torch.from_numpy(o) for o in outputs)
+        return tensors[0] if len(tensors) == 1 else tensors
+
+
+# --- EXPORT ---
+def _export_one(module: torch.nn.Module, name: str, shape: tuple, export_dir: str, formats: list, n_outputs: int):
+    example = torch.zeros(*shape)
+    paths = []
+
+    if "torchscript" in formats:
+        path = artifact_path(export_dir, name, "torchscript")
+        with torch.no_grad():
+            traced = torch.jit.trace(module, example)
+        torch.jit.save(traced, path)
+        paths.append(path)
+
+    if "onnx" in formats:
+        path = artifact_path(export_dir, name, "onnx")
+        output_names = [f"output_{i}" for i in range(n_outputs)]
+        dynamic_axes = {"input": {0: "batch", 2: "height", 3: "width"}}
+        dynamic_axes.update({o: {0: "batch"} for o in output_names})
+        torch.onnx.export(
+            module, example, path,
+            input_names=["input"], output_names=output_names,
+            dynamic_axes=dynamic_axes, opset_version=17
+        )
+        paths.append(path)
+
+    return paths
+
+
+def export_models(face_engine, export_dir: str = EXPORT_DIR, formats=("torchscript", "onnx"), include_mtcnn: bool = True) -> list:
+    """
+    Export InceptionResnetV1 (Float32) dan opsional P/R/O-Net MTCNN ke TorchScript/ONNX.
+    Mengembalikan list path artefak yang ditulis.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    paths = _export_one(face_engine.model.eval(), EMBEDDING_NET, (1, 3, 160, 160), export_dir, list(formats), 1)
+
+    if include_mtcnn:
+        for name, shape in MTCNN_NETS.items():
+            net = getattr(face_engine.mtcnn, name).eval()
+            n_outputs = 3 if name == "onet" else 2
+            paths += _export_one(net, name, shape, export_dir, list(formats), n_outputs)
+
+    return paths
+
+
+# --- LOAD ---
+def load_module(export_dir: str, name: str, runtime: str, device=torch.device('cpu')):
+    """Muat artefak satu jaringan. Mengembalikan None jika artefak / runtime tidak tersedia."""
+    if runtime == "eager":
+        return None
+
+    path = artifact_path(export_dir, name, runtime)
+    if not os.path.exists(path):
+        return None
+
+    if runtime == "torchscript":
+        return torch.jit.load(path, map_location=device).eval()
+
+    if runtime == "onnx":
+        if ort is None:
+            print("[ModelRuntime] ⚠️ onnxruntime is not installed.")
+            return None
+        return OnnxModule(path)
+
+    raise ValueError(f"Runtime '{runtime}' tidak dikenal. Pilih: {RUNTIMES}")
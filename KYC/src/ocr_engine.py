@@ -3,10 +3,21 @@ from PIL import Image
 import numpy as np
 from typing import List, Dict
 
+from .card_detector import normalize_card, crop_regions
+from . import telemetry
+
 class OCREngine:
-    def __init__(self):
+    def __init__(self, preprocess: bool = False, field_regions: bool = False):
+        """
+        preprocess: lokalisasi + deskew kartu ke resolusi kanonik sebelum OCR (opt-in, default off:
+                    aktifkan setelah benchmark_ocr_preprocess.py menunjukkan akurasi field tidak turun).
+        field_regions: jika kartu ditemukan, OCR hanya pada region field yang dipakai IDParser
+                       (hanya berlaku bila preprocess=True).
+        """
         print("[OCREngine] Initializing EasyOCR Reader (Lang: EN, ES)...")
         self.is_ready = False 
+        self.preprocess = preprocess
+        self.field_regions = field_regions
         
         try:
             # Menggunakan model multilingual (English & Spanish)
@@ -16,31 +27,47 @@ class OCREngine:
         except Exception as e:
             print(f"[OCREngine] FATAL ERROR LOADING READER: {e}")
 
-    def extract_text(self, image: Image.Image) -> List[Dict]:
+    def warmup(self):
+        """Satu OCR dummy agar inisialisasi lazy EasyOCR tidak terjadi di request pertama."""
+        if not self.is_ready:
+            return
+        dummy = np.full((64, 256, 3), 255, dtype=np.uint8)
+        self.reader.readtext(dummy, detail=1)
+
+    def extract_text(self, image) -> List[Dict]:
         """
         Melakukan OCR dan mengembalikan list terstruktur [box, text, confidence].
+        image: PIL Image atau array RGB uint8 (H, W, 3) dari image_decode.decode_image (tanpa copy).
         """
         if not self.is_ready:
             raise RuntimeError("OCR Model is not initialized.")
 
-        # Konversi PIL Image ke Numpy Array
-        image_np = np.array(image.convert('RGB'))
+        # Konversi PIL Image ke Numpy Array (array hasil decode dipakai langsung)
+        image_np = image if isinstance(image, np.ndarray) else np.array(image.convert('RGB'))
         
         try:
-            # EasyOCR mengembalikan: [[bbox], teks, confidence]
-            results = self.reader.readtext(image_np, detail=1) 
-            
+            regions = [("full", image_np, (0, 0))]
+            if self.preprocess:
+                with telemetry.span("ocr.normalize_card"):
+                    card, found = normalize_card(image_np)
+                regions = crop_regions(card) if (found and self.field_regions) else [("card", card, (0, 0))]
+
             structured_output = []
             
-            for (bbox, text, conf) in results:
-                # [FIX]: Pastikan confidence dikonversi ke float standar Python
-                structured_output.append({
-                    "box": bbox, # Koordinat Bounding Box (Masih perlu konversi di Parser)
-                    "text": text,
-                    "conf": float(conf) # Konversi ke float standar
-                })
+            for _, region, (ox, oy) in regions:
+                # EasyOCR mengembalikan: [[bbox], teks, confidence]
+                with telemetry.span("ocr.readtext"):
+                    results = self.reader.readtext(region, detail=1) 
+                
+                for (bbox, text, conf) in results:
+                    # [FIX]: Pastikan confidence dikonversi ke float standar Python
+                    structured_output.append({
+                        "box": [[float(x) + ox, float(y) + oy] for x, y in bbox], # Koordinat relatif ke gambar OCR
+                        "text": text,
+                        "conf": float(conf) # Konversi ke float standar
+                    })
             
             return structured_output
             
         except Exception as e:
-            raise RuntimeError(f"EasyOCR runtime error: {str(e)}")
\ No newline at end of file
+            raise RuntimeError(f"EasyOCR runtime error: {str(e)}")
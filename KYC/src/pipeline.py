@@ -1,36 +1,167 @@
 import os
 import glob
+import json
+import time
+import hashlib
+import contextvars
 import numpy as np
+import torch
 from PIL import Image
-from sklearn.metrics.pairwise import cosine_similarity
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 
 # Import modul lokal
-from .face_engine import FaceEngine
+from .face_engine import FaceEngine, MODEL_ARTIFACT_VERSION
 from .ocr_engine import OCREngine
 from .database import Database
 from .id_parser import IDParser 
+from .gallery import GalleryCache, l2_normalize
+from .ann_index import create_index
+from .result_cache import ResultCache, image_key
+from .sharded_search import ShardedSearcher
+from . import telemetry
+
+# Artefak model wajah hasil kalibrasi (dipakai ulang antar restart)
+FACE_MODEL_ARTIFACT = f"models/face_model_v{MODEL_ARTIFACT_VERSION}.pt"
+
+# Batas cosine similarity untuk dianggap wajah yang sama (1:N maupun 1:1)
+MATCH_THRESHOLD = 0.65
+
+def calibration_files() -> list:
+    extensions = ["*.jpg", "*.jpeg", "*.png", "*.JPG", "*.PNG"]
+    calib_files = set()
+    
+    for ext in extensions:
+        pattern = f"dataset/face/**/{ext}"
+        calib_files.update(glob.glob(pattern, recursive=True))
+    
+    # Urutkan agar pilihan file (dan fingerprint) deterministik
+    return sorted(calib_files)[:50]
+
+def calibration_fingerprint(face_engine: FaceEngine, calib_files: list) -> str:
+    """
+    Hash input kalibrasi (tanpa decode gambar): file + ukuran + mtime, versi torch & backend.
+    Dipakai server dan enroll_faces.py agar keduanya memakai artefak model yang sama.
+    """
+    entries = []
+    for f in calib_files:
+        try:
+            st = os.stat(f)
+            entries.append([f, st.st_size, int(st.st_mtime)])
+        except OSError:
+            pass
+
+    payload = {
+        "version": MODEL_ARTIFACT_VERSION,
+        "torch": torch.__version__,
+        "backend": face_engine.backend,
+        "quantization": face_engine.quantization,
+        "files": entries if face_engine.needs_calibration else [],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
 
 class KYCPipeline:
-    def __init__(self):
+    def __init__(self, search_index: str = "exact", nprobe: int = 8, quantization: str = "none",
+                 face_runtime: str = "eager", cache_size: int = 1024, cache_ttl: float = 3600,
+                 cache_path: str | None = None, embedding_codec: str = "float32", rerank: int = 32,
+                 search_shards: int = 0, engines: tuple = ("ocr", "face"),
+                 onboarding_allow_no_portrait: bool = False):
+        """
+        search_index: 'exact' (brute-force, default) atau 'ivf' (approximate, untuk galeri besar).
+        nprobe: jumlah list IVF yang di-scan per query (knob recall vs latency).
+        quantization: mode kuantisasi FaceEngine ('none', 'dynamic', 'fx_static').
+        face_runtime: 'eager', 'torchscript' atau 'onnx' (artefak dari export_face_model.py).
+        cache_size / cache_ttl / cache_path: cache hasil embedding & OCR per konten gambar
+        (cache_size=0 menonaktifkan cache, cache_path mengaktifkan persistensi di disk).
+        embedding_codec: kode galeri resident ('float32', 'float16', 'int8'). Untuk float16/int8,
+        `rerank` kandidat teratas dinilai ulang dengan vektor float32 dari store (memmap).
+        search_shards: jumlah proses worker untuk exact scan ter-shard (0 = scan di proses ini).
+        engines: engine yang dimuat ('ocr', 'face'). Worker proses pool wajah cukup memuat 'face'.
+        onboarding_allow_no_portrait: jika True, onboarding tetap disimpan walau foto wajah di kartu
+        tidak terdeteksi (selfie tidak terverifikasi). Default False: onboarding ditolak.
+        """
         print("--- Initializing KYC Pipeline ---")
-        self.db = Database()
-        self.ocr_engine = OCREngine()
-        self.id_parser = IDParser() 
-        self.face_engine = FaceEngine()
+        self.ready = False
+        self.onboarding_allow_no_portrait = onboarding_allow_no_portrait
+        self.startup_timings = {}
+
+        # OCR dan Face engine dimuat paralel (keduanya didominasi load bobot model)
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="engine-load") as pool:
+            ocr_future = pool.submit(self._timed, "ocr_engine", OCREngine) if "ocr" in engines else None
+            face_future = (pool.submit(self._timed, "face_engine", lambda: FaceEngine(quantization, face_runtime))
+                           if "face" in engines else None)
+
+            self.db = self._timed("database", Database)
+            self.id_parser = IDParser() 
+
+            # Upload ulang gambar yang sama (retry klien) tidak menjalankan model lagi
+            self.result_cache = ResultCache(cache_size, cache_ttl, cache_path) if cache_size > 0 else None
+
+            # Galeri embedding resident (ter-normalisasi) untuk kyc_match
+            index_file = "data/ivf_index.npz" if search_index == "ivf" else None
+            self.gallery = self._timed("gallery", lambda: GalleryCache(
+                self.db.embedding_store,
+                index=create_index(search_index, nprobe=nprobe),
+                index_file=index_file,
+                compression=embedding_codec,
+                rerank=rerank
+            ))
+            print(f"[Pipeline] Gallery loaded: {self.gallery.size} embeddings ({search_index} search, "
+                  f"{embedding_codec}, {self.gallery.nbytes / 1e6:.1f} MB resident).")
+
+            self.ocr_engine = ocr_future.result() if ocr_future is not None else None
+            self.face_engine = face_future.result() if face_future is not None else None
         
-        self._run_initial_calibration()
+        # Worker shard di-fork setelah thread load engine selesai (aman untuk fork)
+        if search_shards > 0:
+            store = self.db.embedding_store
+            self.gallery.sharded = self._timed("search_shards", lambda: ShardedSearcher(
+                store.MATRIX_FILE, store.dim, workers=search_shards
+            ))
+
+        # Tahap wajah onboarding berjalan di sini, paralel dengan OCR di thread pemanggil
+        self._onboarding_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="onboarding-face")
+
+        if self.face_engine is not None:
+            self._timed("calibration", self._run_initial_calibration)
+        self._log_startup()
+
+    def _timed(self, name: str, fn):
+        t0 = time.perf_counter()
+        result = fn()
+        self.startup_timings[name] = round(time.perf_counter() - t0, 3)
+        return result
+
+    def _log_startup(self):
+        breakdown = ", ".join(f"{k}={v:.2f}s" for k, v in self.startup_timings.items())
+        print(f"[Pipeline] Startup breakdown: {breakdown}")
+
+    def warmup(self):
+        """Jalankan inferensi dummy di semua engine, lalu tandai pipeline siap melayani."""
+        if self.face_engine is not None:
+            self._timed("warmup_face", self.face_engine.warmup)
+        if self.ocr_engine is not None:
+            try:
+                self._timed("warmup_ocr", self.ocr_engine.warmup)
+            except Exception as e:
+                print(f"[Pipeline] ⚠️ OCR warmup failed: {e}")
+        self.ready = True
+        self._log_startup()
 
     def _run_initial_calibration(self):
+        if self.face_engine.runtime != "eager":
+            return
+
+        calib_files = calibration_files()
+        fingerprint = calibration_fingerprint(self.face_engine, calib_files)
+
+        # Input tidak berubah -> pakai model hasil kalibrasi sebelumnya
+        if self.face_engine.load_model_artifact(FACE_MODEL_ARTIFACT, fingerprint):
+            return
+
         calibration_imgs = []
-        extensions = ["*.jpg", "*.jpeg", "*.png", "*.JPG", "*.PNG"]
-        calib_files = []
-        
-        for ext in extensions:
-            pattern = f"dataset/face/**/{ext}"
-            calib_files.extend(glob.glob(pattern, recursive=True))
-        
-        calib_files = calib_files[:50]
+        if not self.face_engine.needs_calibration:
+            calib_files = []
 
         if calib_files:
             print(f"[Pipeline] Found {len(calib_files)} images in dataset for calibration.")
@@ -40,25 +171,77 @@ class KYCPipeline:
                     calibration_imgs.append(img)
                 except:
                     pass
-        
-        if len(calibration_imgs) < 5:
-            print("[Pipeline] Dataset not found or empty. Using Random Noise for calibration.")
-            for _ in range(10):
-                arr = np.random.randint(0, 255, (160, 160, 3), dtype=np.uint8)
-                calibration_imgs.append(Image.fromarray(arr))
-                
+        elif self.face_engine.needs_calibration:
+            # Noise acak tidak berisi wajah, jadi tidak berguna untuk kalibrasi static
+            print("[Pipeline] Calibration dataset not found. FaceEngine will stay in Float32.")
+
         self.face_engine.quantize_model(calibration_imgs)
         del calibration_imgs 
 
+        self.face_engine.save_model_artifact(FACE_MODEL_ARTIFACT, fingerprint)
+
+    # --- CACHE HASIL MODEL (content-addressed) ---
+    def _face_namespace(self) -> str:
+        return f"face:{self.face_engine.runtime}:{self.face_engine.quantization if self.face_engine.is_quantized else 'float32'}"
+
+    def _extract_text(self, image: Image.Image):
+        if self.result_cache is None:
+            return self.ocr_engine.extract_text(image)
+
+        namespace = f"ocr:{self.ocr_engine.preprocess}:{self.ocr_engine.field_regions}"
+        key = image_key(image, namespace)
+        return self.result_cache.get_or_compute(key, lambda: self.ocr_engine.extract_text(image))
+
+    def _extract_embeddings(self, images: list, batch_size: int = 32) -> list:
+        """extract_embedding untuk banyak gambar; hanya gambar yang belum ada di cache yang di-embed."""
+        if self.result_cache is None:
+            keys = [None] * len(images)
+            results = [None] * len(images)
+        else:
+            namespace = self._face_namespace()
+            keys = [image_key(img, namespace) for img in images]
+            results = [self.result_cache.get(k) for k in keys]
+
+        misses = [i for i, r in enumerate(results) if r is None]
+        if len(misses) == 1:
+            computed = [self.face_engine.extract_embedding(images[misses[0]])]
+        elif misses:
+            computed = self.face_engine.extract_embeddings_batch([images[i] for i in misses], batch_size)
+        else:
+            computed = []
+
+        for i, result in zip(misses, computed):
+            results[i] = result
+            # Error deteksi bisa bersifat sementara, jadi tidak di-cache
+            if keys[i] is not None and result.get("message") != "Detection Error":
+                self.result_cache.put(keys[i], result)
+
+        return results
+
+    # --- INSTRUMENTASI ---
+    def _with_timings(self, responses: list, spans) -> list:
+        """Lampirkan breakdown span ke setiap response (main.py membuangnya tanpa header debug)."""
+        if spans is not None:
+            for resp in responses:
+                resp["timings"] = spans
+        return responses
+
     def process_id_card(self, image: Image.Image):
         """Flow 1: Upload DNI -> OCR -> PARSE -> Save JSON"""
-        
+        with telemetry.trace() as spans:
+            with telemetry.span("pipeline.process_id_card"):
+                resp = self._process_id_card(image)
+        return self._with_timings([resp], spans)[0]
+
+    def _process_id_card(self, image: Image.Image):
         try:
-            raw_data = self.ocr_engine.extract_text(image)
+            with telemetry.span("pipeline.ocr"):
+                raw_data = self._extract_text(image)
         except RuntimeError as e:
             return {"status": "error", "message": f"OCR Runtime Failed: {str(e)}"}
             
-        data = self.id_parser.parse_data(raw_data) 
+        with telemetry.span("pipeline.parse"):
+            data = self.id_parser.parse_data(raw_data) 
         
         if not data.get('id_number'):
             return {"status": "failed", "message": "Gagal membaca Nomer ID (DNI) atau format tidak ditemukan."}
@@ -72,56 +255,229 @@ class KYCPipeline:
         return {"status": status, "message": msg, "data": data}
 
     def process_face_registration(self, image: Image.Image, id_number: str, full_name: str):
-        """Flow 2: Upload Wajah -> Detect -> Save CSV (Linked by ID)"""
-        
-        user_ocr = self.db.get_user_by_id(id_number)
-        if not user_ocr:
-            return {"status": "failed", "message": f"ID {id_number} belum terdaftar. Silakan upload DNI dulu."}
+        """Flow 2: Upload Wajah -> Detect -> Save Embedding (Linked by ID)"""
+        return self.process_face_registration_batch([(image, id_number, full_name)])[0]
 
-        result = self.face_engine.extract_embedding(image)
-        
-        if not result['found']:
-            return {"status": "failed", "message": "Wajah tidak terdeteksi. Gunakan foto selfie yang jelas."}
-        
-        self.db.save_embedding(id_number, full_name, result['embedding'])
-        return {"status": "success", "message": "Wajah berhasil didaftarkan."}
+    def process_face_registration_batch(self, items: list, batch_size: int = 32):
+        """
+        Versi batch Flow 2. items: list (image, id_number, full_name).
+        Semua wajah di-embed dalam satu batched forward InceptionResnetV1.
+        """
+        with telemetry.trace() as spans:
+            with telemetry.span("pipeline.face_registration", batch=len(items)):
+                responses = self._process_face_registration_batch(items, batch_size)
+        return self._with_timings(responses, spans)
+
+    def _process_face_registration_batch(self, items: list, batch_size: int):
+        responses = [None] * len(items)
+        pending = []
+        for i, (_, id_number, _) in enumerate(items):
+            if not self.db.get_user_by_id(id_number):
+                responses[i] = {"status": "failed", "message": f"ID {id_number} belum terdaftar. Silakan upload DNI dulu."}
+            else:
+                pending.append(i)
+
+        if not pending:
+            return responses
+
+        with telemetry.span("pipeline.extract_embeddings", batch=len(pending)):
+            results = self._extract_embeddings([items[i][0] for i in pending], batch_size)
+
+        for i, result in zip(pending, results):
+            _, id_number, full_name = items[i]
+            if not result['found']:
+                responses[i] = {"status": "failed", "message": "Wajah tidak terdeteksi. Gunakan foto selfie yang jelas."}
+                continue
+
+            self.db.save_embedding(id_number, full_name, result['embedding'])
+            self.gallery.add(id_number, full_name, result['embedding'])
+            responses[i] = {"status": "success", "message": "Wajah berhasil didaftarkan."}
+
+        return responses
 
     def kyc_match(self, image: Image.Image):
         """Flow 3: Login/Check -> Match Face -> Return User Data + Face Bounding Box"""
-        
-        result = self.face_engine.extract_embedding(image)
+        return self.kyc_match_batch([image])[0]
+
+    def kyc_match_batch(self, images: list, batch_size: int = 32):
+        """
+        Versi batch Flow 3: satu batched forward untuk semua selfie dan
+        satu perkalian matriks galeri untuk semua query.
+        """
+        with telemetry.trace() as spans:
+            with telemetry.span("pipeline.kyc_match", batch=len(images)):
+                responses = self._kyc_match_batch(images, batch_size)
+        return self._with_timings(responses, spans)
+
+    def _kyc_match_batch(self, images: list, batch_size: int):
+        with telemetry.span("pipeline.extract_embeddings", batch=len(images)):
+            results = self._extract_embeddings(images, batch_size)
+
+        found = [i for i, r in enumerate(results) if r['found']]
+        with telemetry.span("gallery.search", batch=len(found)):
+            matches = self.gallery.search_batch([results[i]['embedding'] for i in found], top_k=1) if found else []
+        match_by_image = dict(zip(found, matches))
+
+        return [self._match_response(r, match_by_image.get(i)) for i, r in enumerate(results)]
+
+    def _match_response(self, result: dict, match):
         if not result['found']:
             # Tambahkan respons bounding box kosong jika wajah tidak ditemukan
             return {"status": "error", "message": "Wajah tidak terdeteksi", "face_bbox": None} 
 
-        query_vec = result['embedding'].reshape(1, -1)
-        
-        ids, names, db_vectors = self.db.load_embeddings()
-        if len(ids) == 0:
+        # ids/names sudah di-resolve GalleryCache di bawah lock yang sama dengan pencarian
+        top_idx, top_scores, ids, names = match
+        if len(top_idx) == 0:
             # Tambahkan respons bounding box kosong jika database kosong
             return {"status": "error", "message": "Database wajah kosong", "face_bbox": None}
 
-        sim_scores = cosine_similarity(query_vec, db_vectors)[0]
-        best_idx = np.argmax(sim_scores)
-        score = float(sim_scores[best_idx])
+        score = float(top_scores[0])
         
-        THRESHOLD = 0.65
-        is_match = score > THRESHOLD
+        is_match = score > MATCH_THRESHOLD
         
         # --- PERUBAHAN: Tambahkan face_bbox ke response ---
         resp = {
             "status": "success",
             "match": is_match,
             "similarity_score": f"{score:.4f}",
-            "candidate_name": names[best_idx] if is_match else None,
+            "candidate_name": names[0] if is_match else None,
             "user_details": None,
             "face_bbox": result['face_bbox'] if result['face_bbox'] is not None else None # Pastikan dikonversi ke list
         }
         # ----------------------------------------------------
 
         if is_match:
-            matched_id = str(ids[best_idx]).strip().upper() 
+            matched_id = str(ids[0]).strip().upper() 
             user_data = self.db.get_user_by_id(matched_id)
             resp['user_details'] = user_data
             
-        return resp
\ No newline at end of file
+        return resp
+
+    def kyc_verify(self, image, id_number: str):
+        """Flow 4: Verifikasi 1:1 -> apakah selfie ini milik pemilik ID yang diklaim?"""
+        return self.kyc_verify_batch([(image, id_number)])[0]
+
+    def kyc_verify_batch(self, items: list, batch_size: int = 32):
+        """
+        Versi batch Flow 4. items: list (image, id_number).
+        Hanya embedding milik ID yang diklaim yang dinilai (tanpa scan 1:N galeri).
+        """
+        with telemetry.trace() as spans:
+            with telemetry.span("pipeline.kyc_verify", batch=len(items)):
+                responses = self._kyc_verify_batch(items, batch_size)
+        return self._with_timings(responses, spans)
+
+    def _kyc_verify_batch(self, items: list, batch_size: int):
+        with telemetry.span("pipeline.extract_embeddings", batch=len(items)):
+            results = self._extract_embeddings([image for image, _ in items], batch_size)
+
+        return [self._verify_response(r, id_number) for (_, id_number), r in zip(items, results)]
+
+    def _verify_response(self, result: dict, id_number: str):
+        clean_id = str(id_number).strip().upper()
+        if not result['found']:
+            return {"status": "error", "message": "Wajah tidak terdeteksi", "face_bbox": None}
+
+        with telemetry.span("gallery.score_identity"):
+            scores = self.gallery.score_identity(result['embedding'], clean_id)
+        if len(scores) == 0:
+            return {"status": "failed", "message": f"ID {clean_id} belum memiliki wajah terdaftar.",
+                    "face_bbox": result['face_bbox']}
+
+        # Beberapa embedding per ID (registrasi ulang) -> ambil skor terbaik
+        score = float(scores.max())
+        is_match = score > MATCH_THRESHOLD
+
+        resp = {
+            "status": "success",
+            "match": is_match,
+            "id_number": clean_id,
+            "similarity_score": f"{score:.4f}",
+            "threshold": MATCH_THRESHOLD,
+            "user_details": None,
+            "face_bbox": result['face_bbox']
+        }
+        if is_match:
+            resp['user_details'] = self.db.get_user_by_id(clean_id)
+
+        return resp
+
+    def process_onboarding(self, card_image, selfie_image):
+        """
+        Flow 5: Onboarding sekali jalan (DNI + selfie).
+        OCR/parse kartu dan deteksi/embedding wajah (selfie + foto di kartu) berjalan paralel,
+        lalu data OCR dan embedding disimpan sebagai satu unit.
+        """
+        with telemetry.trace() as spans:
+            with telemetry.span("pipeline.onboarding"):
+                # copy_context agar span di thread wajah ikut tercatat di trace yang sama
+                faces_future = self._onboarding_pool.submit(
+                    contextvars.copy_context().run, self._onboarding_faces, selfie_image, card_image
+                )
+                card = self._onboarding_card(card_image)
+                faces = faces_future.result()
+                resp = self._commit_onboarding(card, faces)
+        return self._with_timings([resp], spans)[0]
+
+    def _onboarding_card(self, card_image):
+        with telemetry.span("pipeline.onboarding_card"):
+            try:
+                raw_data = self._extract_text(card_image)
+            except RuntimeError as e:
+                return {"status": "error", "message": f"OCR Runtime Failed: {str(e)}"}
+
+            data = self.id_parser.parse_data(raw_data)
+            if not data.get('id_number'):
+                return {"status": "failed", "message": "Gagal membaca Nomer ID (DNI) atau format tidak ditemukan."}
+            return {"status": "success", "data": data}
+
+    def _onboarding_faces(self, selfie_image, card_image):
+        # Ukuran selfie dan kartu berbeda, jadi MTCNN mendeteksi per gambar; hanya embedding
+        # InceptionResnetV1 kedua crop yang berjalan dalam satu batched forward
+        with telemetry.span("pipeline.onboarding_faces"):
+            return self._extract_embeddings([selfie_image, card_image])
+
+    def _commit_onboarding(self, card: dict, faces: list):
+        if card["status"] != "success":
+            return card
+
+        selfie, portrait = faces
+        if not selfie['found']:
+            return {"status": "failed", "message": "Wajah tidak terdeteksi. Gunakan foto selfie yang jelas.",
+                    "face_bbox": None}
+
+        # Tanpa foto di kartu, selfie tidak bisa diverifikasi -> tolak (kecuali diizinkan eksplisit)
+        if not portrait['found'] and not self.onboarding_allow_no_portrait:
+            return {"status": "failed",
+                    "message": "Foto wajah di ID Card tidak terdeteksi. Gunakan foto ID Card yang jelas.",
+                    "portrait_match": None, "face_bbox": selfie['face_bbox']}
+
+        # Bandingkan selfie dengan foto di kartu memakai embedding yang sudah dihitung
+        portrait_score = None
+        if portrait['found']:
+            portrait_score = float(l2_normalize(selfie['embedding']) @ l2_normalize(portrait['embedding']))
+            if portrait_score <= MATCH_THRESHOLD:
+                return {
+                    "status": "failed",
+                    "message": "Wajah selfie tidak cocok dengan foto di ID Card.",
+                    "portrait_score": f"{portrait_score:.4f}",
+                    "face_bbox": selfie['face_bbox']
+                }
+
+        data = card["data"]
+        success, msg = self.db.save_onboarding(data, selfie['embedding'])
+        if success:
+            self.gallery.add(data['id_number'], data.get('full_name', 'Unknown'), selfie['embedding'])
+            if not data.get('id_valid', False):
+                msg += " (Warning: Checksum ID tidak valid, kemungkinan DNI palsu/salah baca)"
+            if portrait_score is None:
+                msg += " (Warning: Foto wajah di ID Card tidak terdeteksi, selfie tidak diverifikasi)"
+
+        return {
+            "status": "success" if success else "failed",
+            "message": msg,
+            "data": data,
+            "portrait_match": None if portrait_score is None else True,
+            "portrait_score": None if portrait_score is None else f"{portrait_score:.4f}",
+            "face_bbox": selfie['face_bbox']
+        }
@@ -0,0 +1,109 @@
+import os
+import json
+import sqlite3
+import threading
+
+
+class OCRRecordStore:
+    """
+    Penyimpanan data OCR berbasis SQLite (key = ID Number).
+    - Lookup by ID memakai PRIMARY KEY (B-tree, O(log N))
+    - Insert transaksional; cek duplikasi dan tulis dalam satu statement (aman untuk multi-worker)
+    """
+
+    def __init__(self, db_file: str):
+        self.DB_FILE = db_file
+        self._local = threading.local()
+
+        folder = os.path.dirname(self.DB_FILE)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_records ("
+                " id_number TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Koneksi SQLite tidak boleh dipakai lintas thread -> satu koneksi per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.DB_FILE, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, id_number: str) -> dict | None:
+        row = self._conn().execute(
+            "SELECT data FROM ocr_records WHERE id_number = ?", (id_number,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def exists(self, id_number: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM ocr_records WHERE id_number = ?", (id_number,)
+        ).fetchone()
+        return row is not None
+
+    def insert(self, id_number: str, data: dict) -> bool:
+        """Insert satu record. Mengembalikan False jika ID sudah ada."""
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO ocr_records (id_number, data) VALUES (?, ?)",
+                (id_number, json.dumps(data))
+            )
+        return cur.rowcount == 1
+
+    def insert_many(self, records: dict) -> list:
+        """
+        Insert banyak record {id_number: data} dalam satu transaksi.
+        Mengembalikan list ID yang benar-benar baru (ID yang sudah ada diabaikan).
+        """
+        conn = self._conn()
+        inserted = []
+        with conn:
+            for id_number, data in records.items():
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO ocr_records (id_number, data) VALUES (?, ?)",
+                    (id_number, json.dumps(data))
+                )
+                if cur.rowcount == 1:
+                    inserted.append(id_number)
+        return inserted
+
+    def delete(self, id_number: str) -> bool:
+        """Hapus satu record (dipakai untuk rollback onboarding). False jika ID tidak ada."""
+        conn = self._conn()
+        with conn:
+            cur = conn.execute("DELETE FROM ocr_records WHERE id_number = ?", (id_number,))
+        return cur.rowcount == 1
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM ocr_records").fetchone()[0]
+
+
+def import_json(json_file: str, store: OCRRecordStore) -> int:
+    """Import id_data.json lama ({id_number: data}) ke OCRRecordStore. Mengembalikan jumlah record baru."""
+    if not os.path.exists(json_file) or os.path.getsize(json_file) == 0:
+        return 0
+
+    with open(json_file, 'r') as f:
+        db_data = json.load(f)
+
+    if not isinstance(db_data, dict):
+        return 0
+
+    records = {}
+    for key, data in db_data.items():
+        clean_id = str(key).strip().upper()
+        if isinstance(data, dict):
+            data['id_number'] = clean_id
+            records[clean_id] = data
+
+    return len(store.insert_many(records))
@@ -0,0 +1,133 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from PIL import Image
+
+
+def image_key(image, namespace: str) -> str:
+    """
+    Hash konten gambar yang sudah di-decode (piksel + mode + ukuran), bukan bytes file upload.
+    image: PIL Image atau array uint8 (di-hash langsung dari buffer-nya, tanpa copy).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(namespace.encode())
+    if isinstance(image, np.ndarray):
+        h.update(f"ndarray:{image.dtype}:{image.shape}".encode())
+        h.update(np.ascontiguousarray(image).data)
+    else:
+        h.update(f"{image.mode}:{image.size}".encode())
+        h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache LRU ber-kapasitas terbatas dengan TTL untuk hasil extract_embedding / extract_text.
+    Jika `persist_path` diisi, entri juga ditulis ke SQLite dan dimuat ulang saat start.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, persist_path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.persist_path = persist_path
+
+        self._entries = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if persist_path:
+            self._open_persistent()
+
+    # --- PERSISTENCE ---
+    def _open_persistent(self):
+        folder = os.path.dirname(self.persist_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._db = sqlite3.connect(self.persist_path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, created_at REAL, value BLOB)"
+            )
+            self._db.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl,))
+
+        rows = self._db.execute(
+            "SELECT key, created_at, value FROM results ORDER BY created_at DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        for key, created_at, value in reversed(rows):
+            self._entries[key] = (created_at, pickle.loads(value))
+
+    def _persist(self, key: str, created_at: float, value):
+        if self._db is None:
+            return
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, created_at, value) VALUES (?, ?, ?)",
+                (key, created_at, pickle.dumps(value))
+            )
+
+    def _forget(self, keys: list):
+        if self._db is None or not keys:
+            return
+        with self._db:
+            self._db.executemany("DELETE FROM results WHERE key = ?", [(k,) for k in keys])
+
+    # --- API ---
+    def get(self, key: str):
+        """Mengembalikan nilai atau None (miss / kedaluwarsa)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._forget([key])
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value):
+        with self._lock:
+            created_at = time.time()
+            self._entries[key] = (created_at, value)
+            self._entries.move_to_end(key)
+
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self.evictions += len(evicted)
+
+            self._persist(key, created_at, value)
+            self._forget(evicted)
+
+    def get_or_compute(self, key: str, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,104 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .ann_index import select_top_k
+from .embedding_store import HEADER_SIZE
+
+# threadpoolctl opsional (ikut terpasang bersama scikit-learn): 1 thread BLAS per worker
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+
+# --- STATE WORKER PROSES ---
+# (file, inode, start) -> (stop, memmap segmen, 1/norm per baris)
+_segments = {}
+
+def _init_shard_worker():
+    # Paralelisme datang dari jumlah proses, bukan thread BLAS di tiap proses
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+
+def _load_segment(matrix_file: str, dim: int, start: int, stop: int, chunk_size: int):
+    key = (matrix_file, os.stat(matrix_file).st_ino, start)
+    cached = _segments.get(key)
+    if cached is not None and cached[0] == stop:
+        return cached[1], cached[2]
+
+    # Memmap read-only: halaman file dibagi lewat page cache OS, tidak disalin per proses
+    vectors = np.memmap(matrix_file, dtype='<f4', mode='r',
+                        offset=HEADER_SIZE + start * dim * 4, shape=(stop - start, dim))
+    norms = np.empty(stop - start, dtype=np.float32)
+    for s in range(0, stop - start, chunk_size):
+        norms[s:s + chunk_size] = np.linalg.norm(vectors[s:s + chunk_size], axis=1)
+    norms[norms == 0] = 1.0
+
+    _segments[key] = (stop, vectors, 1.0 / norms)
+    return vectors, 1.0 / norms
+
+def _search_segment(matrix_file: str, dim: int, start: int, stop: int,
+                    queries: np.ndarray, top_k: int, chunk_size: int):
+    vectors, inv_norms = _load_segment(matrix_file, dim, start, stop, chunk_size)
+
+    scores = np.empty((stop - start, queries.shape[0]), dtype=np.float32)
+    for s in range(0, stop - start, chunk_size):
+        scores[s:s + chunk_size] = vectors[s:s + chunk_size] @ queries.T
+    scores *= inv_norms[:, None]
+
+    results = []
+    for column in scores.T:
+        idx = select_top_k(column, top_k)
+        results.append((idx + start, column[idx]))
+    return results
+
+def _noop(_):
+    return os.getpid()
+
+
+class ShardedSearcher:
+    """
+    Exact cosine top-k paralel di banyak core.
+    Galeri (file matriks EmbeddingStore) dibagi menjadi segmen berukuran tetap `segment_rows`;
+    tiap segmen dinilai oleh proses worker lewat memmap bersama, lalu top-k per segmen digabung.
+    Segmen berukuran tetap membuat append hanya meng-invalidasi segmen terakhir di cache worker.
+    """
+
+    def __init__(self, matrix_file: str, dim: int, workers: int | None = None,
+                 segment_rows: int = 65536, min_rows: int | None = None, chunk_size: int = 8192):
+        self.matrix_file = matrix_file
+        self.dim = dim
+        self.workers = workers or os.cpu_count()
+        self.segment_rows = segment_rows
+        self.chunk_size = chunk_size
+        # Di bawah ini overhead IPC lebih besar dari scan-nya sendiri -> pakai scan lokal
+        self.min_rows = min_rows if min_rows is not None else 2 * segment_rows
+
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_shard_worker)
+        # Start semua worker sekarang (saat startup), bukan di tengah request pertama
+        list(self._pool.map(_noop, range(self.workers)))
+
+    def search(self, queries: np.ndarray, top_k: int, size: int) -> list:
+        """
+        queries: (n, dim) ter-normalisasi. size: jumlah baris galeri yang dinilai.
+        Mengembalikan list (indices, scores) per query, sama seperti GalleryCache.search_batch.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        futures = [
+            self._pool.submit(_search_segment, self.matrix_file, self.dim, start,
+                              min(start + self.segment_rows, size), queries, top_k, self.chunk_size)
+            for start in range(0, size, self.segment_rows)
+        ]
+        per_segment = [f.result() for f in futures]
+
+        merged = []
+        for q in range(queries.shape[0]):
+            idx = np.concatenate([seg[q][0] for seg in per_segment])
+            scores = np.concatenate([seg[q][1] for seg in per_segment])
+            best = select_top_k(scores, top_k)
+            merged.append((idx[best], scores[best]))
+        return merged
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,201 @@
+"""
+Instrumentasi ringan untuk KYC service (tanpa dependensi tambahan).
+- span(stage): mengukur durasi satu stage -> histogram Prometheus + entri di trace aktif
+- trace(): mengumpulkan span milik satu request/batch (untuk breakdown di response debug)
+- register_gauge(): nilai sesaat (queue depth, ukuran galeri) yang ikut dicatat di setiap span
+Saat nonaktif, span() dan trace() hanya mengembalikan context manager kosong.
+Catatan: dengan worker pool 'process', metrik dari proses worker tidak muncul di /metrics
+(breakdown di response tetap tersedia karena ikut di-pickle bersama hasil).
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = False
+_NOOP = nullcontext()
+_current_trace = ContextVar("kyc_trace", default=None)
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# --- METRIK ---
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label_values -> [counts per bucket (+Inf terakhir), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_label = f'le="{le}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, bucket_label)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+_metrics = []
+_gauges = []  # (nama metrik, label dict, fn, key untuk trace)
+
+
+def counter(name: str, help_text: str, labels: tuple = ()) -> Counter:
+    metric = Counter(name, help_text, labels)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, help_text, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_gauge(name: str, fn, **labels):
+    """Gauge dibaca saat /metrics di-scrape dan saat span dimulai (mis. queue depth)."""
+    key = name.removeprefix("kyc_") + "".join(f".{v}" for v in labels.values())
+    _gauges.append((name, labels, fn, key))
+
+
+def snapshot() -> dict:
+    values = {}
+    for _, _, fn, key in _gauges:
+        try:
+            values[key] = fn()
+        except Exception:
+            values[key] = None
+    return values
+
+
+def render() -> str:
+    """Semua metrik dalam format teks Prometheus (exposition format 0.0.4)."""
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+
+    seen = set()
+    for name, labels, fn, _ in _gauges:
+        if name not in seen:
+            lines += [f"# TYPE {name} gauge"]
+            seen.add(name)
+        try:
+            value = fn()
+        except Exception:
+            continue
+        lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = histogram("kyc_stage_duration_seconds", "Durasi per stage pipeline KYC.", ("stage",))
+STAGE_ERRORS = counter("kyc_stage_errors_total", "Jumlah exception per stage pipeline KYC.", ("stage",))
+
+
+# --- SPAN & TRACE ---
+class _Span:
+    __slots__ = ("stage", "attrs", "start", "gauges")
+
+    def __init__(self, stage: str, attrs: dict):
+        self.stage = stage
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.gauges = snapshot() if _current_trace.get() is not None else None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.stage)
+
+        spans = _current_trace.get()
+        if spans is not None:
+            entry = {"stage": self.stage, "ms": round(elapsed * 1000, 3)}
+            entry.update(self.attrs)
+            if self.gauges:
+                entry.update(self.gauges)
+            spans.append(entry)
+        return False
+
+
+def span(stage: str, **attrs):
+    """Context manager pengukur satu stage. Tanpa biaya berarti saat instrumentasi nonaktif."""
+    if not _enabled:
+        return _NOOP
+    return _Span(stage, attrs)
+
+
+@contextmanager
+def trace():
+    """
+    Kumpulkan span yang terjadi di context ini. Menghasilkan list entri
+    ({stage, ms, ...gauge}) atau None jika instrumentasi nonaktif.
+    """
+    if not _enabled:
+        yield None
+        return
+
+    spans = []
+    token = _current_trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_trace.reset(token)
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Kode penyimpanan galeri resident (float32 = tanpa kompresi)
+#   float16 : 2 byte/dimensi (1 KB per embedding 512-d)
+#   int8    : 1 byte/dimensi + skala float32 per vektor (~516 byte per embedding)
+CODECS = ("float32", "float16", "int8")
+
+
+class CompressedMatrix:
+    """
+    Matriks embedding ter-normalisasi dalam kode float16 / int8 (skala per vektor).
+    Dipakai GalleryCache untuk coarse scan; skor akhir di-re-rank terhadap vektor float32
+    di EmbeddingStore (memmap). Indexing (`m[rows]`, `m[a:b]`) mengembalikan float32
+    hasil de-kuantisasi, sehingga bisa dipakai IVFIndex seperti ndarray biasa.
+    """
+
+    def __init__(self, codec: str, dim: int, capacity: int = 1024, chunk_size: int = 1024):
+        if codec not in ("float16", "int8"):
+            raise ValueError(f"Codec '{codec}' tidak dikenal. Pilih: {CODECS[1:]}")
+
+        self.codec = codec
+        self.dim = dim
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._capacity = capacity
+        self._codes = np.empty((capacity, dim), dtype=np.float16 if codec == "float16" else np.int8)
+        self._scales = np.empty(capacity if codec == "int8" else 0, dtype=np.float32)
+
+    @property
+    def shape(self) -> tuple:
+        return (self.size, self.dim)
+
+    @property
+    def nbytes(self) -> int:
+        """Memori yang benar-benar terisi (kode + skala)."""
+        per_row = self._codes.itemsize * self.dim + (4 if self.codec == "int8" else 0)
+        return self.size * per_row
+
+    def __len__(self) -> int:
+        return self.size
+
+    def reset(self):
+        self.size = 0
+
+    def _grow(self, needed: int):
+        new_capacity = max(needed, self._capacity * 2)
+        codes = np.empty((new_capacity, self.dim), dtype=self._codes.dtype)
+        codes[:self.size] = self._codes[:self.size]
+        self._codes = codes
+        if self.codec == "int8":
+            scales = np.empty(new_capacity, dtype=np.float32)
+            scales[:self.size] = self._scales[:self.size]
+            self._scales = scales
+        self._capacity = new_capacity
+
+    def append(self, vectors: np.ndarray):
+        """Tambah vektor (float32, sudah ter-normalisasi) sebagai kode."""
+        n = vectors.shape[0]
+        needed = self.size + n
+        if needed > self._capacity:
+            self._grow(needed)
+
+        if self.codec == "float16":
+            self._codes[self.size:needed] = vectors
+        else:
+            # Kuantisasi simetris per vektor: nilai absolut terbesar -> 127
+            max_abs = np.abs(vectors).max(axis=1)
+            scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+            self._codes[self.size:needed] = np.rint(vectors / scales[:, None])
+            self._scales[self.size:needed] = scales
+        self.size = needed
+
+    def __getitem__(self, rows) -> np.ndarray:
+        codes = self._codes[:self.size][rows]
+        if self.codec == "float16":
+            return codes.astype(np.float32)
+        return codes.astype(np.float32) * self._scales[:self.size][rows][..., None]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Skor perkiraan (size, n_query) = kode @ queries.T, dihitung per chunk kecil agar
+        hasil de-kuantisasi tetap di cache CPU dan tidak pernah menyalin seluruh galeri.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        out = np.empty((self.size, queries.shape[0]), dtype=np.float32)
+        for start in range(0, self.size, self.chunk_size):
+            stop = min(start + self.chunk_size, self.size)
+            block = self._codes[start:stop].astype(np.float32) @ queries.T
+            if self.codec == "int8":
+                block *= self._scales[start:stop, None]
+            out[start:stop] = block
+        return out
@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+from . import telemetry
+
+
+class PoolSaturatedError(RuntimeError):
+    """Antrian worker penuh: request ditolak (dipetakan ke HTTP 503 di main.py)."""
+
+
+# --- STATE WORKER PROSES (mode 'process') ---
+_worker_pipeline = None
+
+def _init_process_worker(config: dict, telemetry_enabled: bool):
+    # Setiap proses worker memuat pipeline-nya sendiri satu kali, dengan konfigurasi server
+    global _worker_pipeline
+    from .pipeline import KYCPipeline
+    telemetry.enable(telemetry_enabled)
+    _worker_pipeline = KYCPipeline(**config)
+    _worker_pipeline.warmup()
+
+def _call_process_worker(method: str, *args):
+    return getattr(_worker_pipeline, method)(*args)
+
+
+class PipelineWorkerPool:
+    """
+    Pool worker ber-kapasitas terbatas untuk memanggil method KYCPipeline di luar event loop.
+    - kind='thread'  : worker berbagi `pipeline` milik proses utama
+    - kind='process' : tiap proses worker memuat KYCPipeline(**config) sendiri (bebas GIL, memori
+                       lebih besar). `config` = argumen KYCPipeline milik server, termasuk `engines`
+                       agar worker hanya memuat engine yang dibutuhkan pool tersebut.
+    Maksimal `max_workers + max_queue` task aktif; selebihnya ditolak dengan PoolSaturatedError.
+    """
+
+    def __init__(self, name: str, pipeline=None, kind: str = "thread", max_workers: int = 1, max_queue: int = 8,
+                 config: dict | None = None):
+        self.name = name
+        self.kind = kind
+        self.pipeline = pipeline
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        if kind == "thread":
+            if pipeline is None:
+                raise ValueError("Pool 'thread' membutuhkan instance pipeline.")
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        elif kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_process_worker,
+                                                 initargs=(config or {}, telemetry.is_enabled()))
+        else:
+            raise ValueError(f"Jenis pool '{kind}' tidak dikenal. Gunakan 'thread' atau 'process'.")
+
+    def submit(self, method: str, *args) -> Future:
+        """Jadwalkan pipeline.<method>(*args). Raise PoolSaturatedError jika antrian penuh."""
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturatedError(f"{self.name} pool saturated ({self.max_workers} workers, queue {self.max_queue}).")
+
+        with self._lock:
+            self._in_flight += 1
+
+        try:
+            if self.kind == "thread":
+                future = self._executor.submit(getattr(self.pipeline, method), *args)
+            else:
+                future = self._executor.submit(_call_process_worker, method, *args)
+        except Exception:
+            self._release(None)
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def queue_depth(self) -> int:
+        """Jumlah task yang menunggu worker (belum dieksekusi)."""
+        with self._lock:
+            return max(0, self._in_flight - self.max_workers)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import multiprocessing
+import numpy as np
+
+from src.embedding_store import EmbeddingStore, HEADER_SIZE
+
+DIM = 8
+
+def _vector(value):
+    return np.full(DIM, value, dtype=np.float32)
+
+def _store(workdir):
+    return EmbeddingStore(os.path.join(workdir, "e.bin"), os.path.join(workdir, "e_index.csv"), dim=DIM)
+
+def test_torn_append_leaves_orphan_vector():
+    """Proses mati setelah vektor ditulis tapi sebelum index: append berikutnya tetap berpasangan benar."""
+    with tempfile.TemporaryDirectory() as workdir:
+        _store(workdir).append("A", "User A", _vector(1.0))
+
+        # Simulasi append terputus: vektor yatim tanpa baris index
+        store = _store(workdir)
+        with open(store.MATRIX_FILE, 'ab') as f:
+            f.write(_vector(9.0).tobytes())
+
+        _store(workdir).append("B", "User B", _vector(2.0))
+
+        ids, names, vectors = _store(workdir).load()
+        assert ids == ["A", "B"]
+        assert names == ["User A", "User B"]
+        np.testing.assert_array_equal(vectors[1], _vector(2.0))
+        assert os.path.getsize(store.MATRIX_FILE) == HEADER_SIZE + 2 * DIM * 4
+
+def test_torn_append_partial_vector_and_index_line():
+    """Vektor terpotong di tengah dan baris index tanpa newline juga dibuang."""
+    with tempfile.TemporaryDirectory() as workdir:
+        store = _store(workdir)
+        store.append("A", "User A", _vector(1.0))
+
+        with open(store.MATRIX_FILE, 'ab') as f:
+            f.write(_vector(9.0).tobytes()[:DIM * 2])
+        with open(store.INDEX_FILE, 'a', encoding='utf-8') as f:
+            f.write("X,Use")
+
+        # Instance yang sama (state index ter-cache) harus tetap mendeteksi sisa append
+        store.append("B", "User B", _vector(2.0))
+
+        ids, _, vectors = _store(workdir).load()
+        assert ids == ["A", "B"]
+        np.testing.assert_array_equal(vectors[0], _vector(1.0))
+        np.testing.assert_array_equal(vectors[1], _vector(2.0))
+
+def _append_worker(workdir, worker, appends):
+    store = _store(workdir)
+    for i in range(appends):
+        # Nilai vektor mengodekan ID-nya sehingga pasangan ID <-> vektor bisa dicek
+        store.append(f"W{worker}-{i}", f"Worker {worker}", _vector(worker * 1000 + i))
+
+def test_concurrent_appends_from_processes():
+    """Beberapa proses menulis ke store yang sama: tidak ada baris hilang atau tertukar."""
+    workers, appends = 4, 100
+    with tempfile.TemporaryDirectory() as workdir:
+        procs = [multiprocessing.Process(target=_append_worker, args=(workdir, w, appends)) for w in range(workers)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            assert proc.exitcode == 0
+
+        ids, _, vectors = _store(workdir).load()
+        assert len(ids) == workers * appends
+        assert len(set(ids)) == workers * appends
+        for id_number, vector in zip(ids, vectors):
+            worker, i = id_number[1:].split("-")
+            np.testing.assert_array_equal(vector, _vector(int(worker) * 1000 + int(i)))
+
+        # Store tetap bisa di-append setelahnya
+        _store(workdir).append("Z", "User Z", _vector(-1.0))
+        assert _store(workdir).count() == workers * appends + 1
+
+if __name__ == "__main__":
+    test_torn_append_leaves_orphan_vector()
+    test_torn_append_partial_vector_and_index_line()
+    test_concurrent_appends_from_processes()
+    print("✅ SUCCESS: torn append tests passed.")
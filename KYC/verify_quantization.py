@@ -0,0 +1,110 @@
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+import torch
+from PIL import Image
+
+from src.face_engine import FaceEngine
+
+# --- KONFIGURASI DEFAULT ---
+DATASET_DIR = "dataset/face"
+THRESHOLD = 0.65  # Sama dengan KYCPipeline
+MODES = ["dynamic", "fx_static"]
+EXTENSIONS = ["*.jpg", "*.png"]
+
+def load_dataset(root, max_per_identity):
+    """Folder di dataset/face = satu identitas."""
+    samples = []
+    for person in sorted(os.listdir(root)):
+        files = sorted(f for ext in EXTENSIONS for f in glob.glob(os.path.join(root, person, ext)))[:max_per_identity]
+        samples.extend((person, f) for f in files)
+    return samples
+
+def embed_all(model, crops):
+    latencies, embeddings = [], []
+    with torch.no_grad():
+        for crop in crops:
+            t0 = time.perf_counter()
+            emb = model(crop.unsqueeze(0))
+            latencies.append((time.perf_counter() - t0) * 1000)
+            embeddings.append(emb.numpy().flatten())
+    emb = np.vstack(embeddings)
+    return emb / np.linalg.norm(emb, axis=1, keepdims=True), np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifikasi akurasi & latency kuantisasi FaceEngine vs Float32.")
+    parser.add_argument("--max-per-identity", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Simpan laporan sebagai JSON.")
+    args = parser.parse_args()
+
+    samples = load_dataset(DATASET_DIR, args.max_per_identity)
+    if not samples:
+        print(f"Error: Dataset {DATASET_DIR} kosong.")
+        return
+
+    reference = FaceEngine(quantization="none")
+
+    # Crop dihitung sekali agar perbedaan hanya berasal dari model embedding
+    labels, crops, images = [], [], []
+    for person, f in samples:
+        img = Image.open(f).convert('RGB')
+        crop, _, _ = reference.detect_face(img)
+        if crop is not None:
+            labels.append(person)
+            crops.append(crop)
+            images.append(img)
+
+    # Gambar genap untuk kalibrasi, gambar ganjil untuk evaluasi (tidak pernah dilihat kalibrasi)
+    calibration = images[::2]
+    crops = crops[1::2]
+    labels = np.array(labels[1::2])
+    print(f"[Verify] {len(calibration)} calibration images, {len(crops)} evaluation faces, "
+          f"{len(set(labels))} identities.")
+
+    ref_emb, ref_lat = embed_all(reference.model, crops)
+    ref_sim = ref_emb @ ref_emb.T
+    pair_mask = np.triu(np.ones_like(ref_sim, dtype=bool), k=1)
+    ref_decisions = ref_sim[pair_mask] > THRESHOLD
+    same_identity = (labels[:, None] == labels[None, :])[pair_mask]
+
+    report = {"threshold": THRESHOLD, "n_faces": len(crops), "n_calibration": len(calibration), "float32": {
+        "latency_p50_ms": float(np.percentile(ref_lat, 50)),
+        "pair_accuracy": float(np.mean(ref_decisions == same_identity)),
+    }}
+
+    print(f"\n{'mode':<12}{'p50 ms':>9}{'speedup':>9}{'cos drift mean':>16}{'max':>8}{'decision agree':>16}{'pair acc':>10}")
+    print(f"{'float32':<12}{report['float32']['latency_p50_ms']:>9.1f}{1.0:>9.2f}{0.0:>16.4f}{0.0:>8.4f}{1.0:>16.4f}{report['float32']['pair_accuracy']:>10.4f}")
+
+    for mode in MODES:
+        engine = FaceEngine(quantization=mode)
+        engine.quantize_model(calibration)
+        if not engine.is_quantized:
+            print(f"{mode:<12} quantization not available, skipped.")
+            continue
+
+        q_emb, q_lat = embed_all(engine.model, crops)
+        drift = 1.0 - np.sum(ref_emb * q_emb, axis=1)
+        q_decisions = (q_emb @ q_emb.T)[pair_mask] > THRESHOLD
+
+        row = {
+            "latency_p50_ms": float(np.percentile(q_lat, 50)),
+            "speedup": float(np.percentile(ref_lat, 50) / np.percentile(q_lat, 50)),
+            "cosine_drift_mean": float(drift.mean()),
+            "cosine_drift_max": float(drift.max()),
+            "decision_agreement": float(np.mean(q_decisions == ref_decisions)),
+            "pair_accuracy": float(np.mean(q_decisions == same_identity)),
+        }
+        report[mode] = row
+        print(f"{mode:<12}{row['latency_p50_ms']:>9.1f}{row['speedup']:>9.2f}{row['cosine_drift_mean']:>16.4f}"
+              f"{row['cosine_drift_max']:>8.4f}{row['decision_agreement']:>16.4f}{row['pair_accuracy']:>10.4f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nLaporan disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+from ultralytics import YOLO
+import supervision as sv
+
+from main import MODEL_PATH, VIDEO_SOURCE, CONFIDENCE_THRESHOLD, IOU_THRESHOLD
+
+# --- KONFIGURASI DEFAULT ---
+N_FRAMES = 300
+BATCH_SIZES = [1, 2, 4, 8, 16]
+
+def load_frames(source, limit):
+    """Decode frame ke memori lebih dulu agar yang diukur hanya inference + tracking."""
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def run(model, frames, batch_size, conf, iou):
+    """
+    Inference batch + ByteTrack berurutan, sama seperti pipeline main.py.
+    Mengembalikan (track per frame, detik inference, detik total).
+    """
+    tracker = sv.ByteTrack(frame_rate=30)
+    tracks, infer_s = [], 0.0
+
+    start = time.perf_counter()
+    for s in range(0, len(frames), batch_size):
+        batch = frames[s:s + batch_size]
+        t0 = time.perf_counter()
+        results = model(batch, conf=conf, iou=iou, verbose=False)
+        infer_s += time.perf_counter() - t0
+
+        for r in results:
+            detections = tracker.update_with_detections(sv.Detections.from_ultralytics(r))
+            tracks.append((detections.tracker_id.copy(), detections.xyxy.copy()))
+    return tracks, infer_s, time.perf_counter() - start
+
+def compare_tracks(tracks, reference):
+    """(identik persis?, selisih bbox maksimum dalam piksel) terhadap jalur per frame."""
+    identical, max_diff = True, 0.0
+    for (ids, boxes), (ref_ids, ref_boxes) in zip(tracks, reference):
+        if not np.array_equal(ids, ref_ids):
+            return False, float("inf")
+        if boxes.size:
+            max_diff = max(max_diff, float(np.abs(boxes - ref_boxes).max()))
+        identical = identical and np.array_equal(boxes, ref_boxes)
+    return identical, max_diff
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput inference YOLO per batch size (video offline).")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--source", default=VIDEO_SOURCE)
+    parser.add_argument("--frames", type=int, default=N_FRAMES)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--conf", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=IOU_THRESHOLD)
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON.")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        print(f"Error: Tidak bisa membaca frame dari {args.source}")
+        return
+    print(f"Memuat model dari: {args.model} | {len(frames)} frame {frames[0].shape[1]}x{frames[0].shape[0]}")
+    model = YOLO(args.model)
+
+    # Referensi: jalur per frame (batch 1), sama dengan main.py default
+    batch_sizes = [1] + [b for b in args.batch_sizes if b != 1]
+    report = {"model": args.model, "source": args.source, "frames": len(frames), "runs": []}
+    reference, base_fps = None, None
+
+    print(f"\n{'batch':>6}{'FPS':>9}{'infer ms/frame':>16}{'speedup':>9}{'tracks identik':>16}{'max Δbbox px':>14}")
+    for batch_size in batch_sizes:
+        model(frames[:batch_size], conf=args.conf, iou=args.iou, verbose=False)  # warm-up
+        tracks, infer_s, total_s = run(model, frames, batch_size, args.conf, args.iou)
+
+        fps = len(frames) / total_s
+        if reference is None:
+            reference, base_fps = tracks, fps
+        identical, max_diff = compare_tracks(tracks, reference)
+
+        row = {"batch_size": batch_size, "fps": fps, "infer_ms_per_frame": infer_s / len(frames) * 1000,
+               "speedup": fps / base_fps, "tracks_identical": identical, "max_bbox_diff_px": max_diff}
+        report["runs"].append(row)
+        print(f"{batch_size:>6}{fps:>9.1f}{row['infer_ms_per_frame']:>16.2f}{row['speedup']:>9.2f}"
+              f"{str(identical):>16}{max_diff:>14.4f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nHasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,179 @@
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
 import cv2
 import numpy as np
 from ultralytics import YOLO
 import supervision as sv
 
-# --- KONFIGURASI ---
+# --- KONFIGURASI (default; bisa diganti lewat argumen CLI) ---
 # Menggunakan model terbaik Anda (v2)
-MODEL_PATH = "results/uav_yolo11n/weights/best.pt" 
-VIDEO_SOURCE = "datasets/night_chase_uav.mp4" 
+MODEL_PATH = "results/uav_yolo11n/weights/best.pt"
+VIDEO_SOURCE = "datasets/night_chase_uav.mp4"
 OUTPUT_PATH = "inference_output/result_clean_yolo_byte.mp4"
+SNAPSHOT_DIR = "inference_output/snapshots"
 
 # --- HYPERPARAMETER ---
 CONFIDENCE_THRESHOLD = 0.5  # Ambang batas kepercayaan (bisa diturunkan ke 0.3 jika kurang sensitif)
 IOU_THRESHOLD = 0.5         # Ambang batas NMS
 
+# --- PIPELINE ---
+QUEUE_SIZE = 8    # Kapasitas antrean antar stage (backpressure: stage cepat menunggu stage lambat)
+LOG_EVERY = 100   # Cetak FPS setiap N frame
+BATCH_SIZE = 1    # Frame per forward pass YOLO (>1 hanya menguntungkan untuk video offline)
+
+_END = object()   # Penanda akhir stream yang diteruskan ke setiap stage
+
+
+class StageTimer:
+    """Akumulasi waktu kerja per stage (tidak termasuk waktu menunggu antrean)."""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, frames=1):
+        with self._lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + frames
+
+    def report(self, frames, elapsed):
+        print("\n--- RINGKASAN PIPELINE ---")
+        print(f"Frame: {frames} | Waktu: {elapsed:.1f}s | FPS: {frames / elapsed if elapsed > 0 else 0:.1f}")
+        print(f"{'stage':<12}{'ms/frame':>10}{'total s':>10}{'sibuk %':>9}")
+        for stage, total in self.totals.items():
+            per_frame = total / self.counts[stage] * 1000
+            busy = total / elapsed * 100 if elapsed > 0 else 0
+            print(f"{stage:<12}{per_frame:>10.2f}{total:>10.1f}{busy:>8.0f}%")
+
+
+class TrackWriter:
+    """
+    Menulis record track per frame (frame, tracker_id, bbox, confidence) secara streaming.
+    Format dipilih dari ekstensi file: .csv -> CSV, selain itu JSONL (satu record per baris).
+    Di-flush setiap frame agar file bisa dibaca proses lain selagi video masih diproses.
+    """
+
+    FIELDS = ["frame", "tracker_id", "class_name", "x1", "y1", "x2", "y2", "confidence"]
+
+    def __init__(self, path, class_names):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.class_names = class_names
+        self.is_csv = path.lower().endswith(".csv")
+        self._file = open(path, "w", newline="")
+        if self.is_csv:
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.FIELDS)
+
+    def write(self, frame_index, detections):
+        for xyxy, tracker_id, class_id, confidence in zip(
+                detections.xyxy, detections.tracker_id, detections.class_id, detections.confidence):
+            x1, y1, x2, y2 = (round(float(v), 1) for v in xyxy)
+            class_name = self.class_names[int(class_id)]
+            if self.is_csv:
+                self._csv.writerow([frame_index, int(tracker_id), class_name, x1, y1, x2, y2, round(float(confidence), 4)])
+            else:
+                self._file.write(json.dumps({
+                    "frame": frame_index,
+                    "tracker_id": int(tracker_id),
+                    "class_name": class_name,
+                    "bbox": [x1, y1, x2, y2],
+                    "confidence": round(float(confidence), 4),
+                }) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def decode_frames(cap, out_q, timer, stop):
+    """Stage 1 (thread): baca frame video ke antrean, berurutan dengan indeks frame."""
+    index = 0
+    try:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                print("Video selesai.")
+                break
+            timer.add("decode", time.perf_counter() - t0)
+            out_q.put((index, frame))  # Blok jika inference tertinggal
+            index += 1
+    finally:
+        out_q.put(_END)
+
+def run_stage(name, fn, in_q, out_qs, timer, stop, batch_size=None):
+    """
+    Loop umum satu stage: ambil item -> fn(item) -> teruskan ke semua antrean keluaran.
+    Jika batch_size diisi, fn menerima list hingga batch_size item (batch terakhir bisa lebih kecil)
+    dan mengembalikan list hasil dengan urutan yang sama; hasil diteruskan satu per satu.
+    Satu thread per stage + antrean FIFO menjaga urutan frame.
+    Saat stop / error, sisa item tetap dikuras sampai _END agar stage sebelumnya tidak macet.
+    """
+    ended = False
+    try:
+        while not ended:
+            batch = []
+            while len(batch) < (batch_size or 1):
+                item = in_q.get()
+                if item is _END:
+                    ended = True
+                    break
+                batch.append(item)
+            if not batch or stop.is_set():
+                continue
+
+            t0 = time.perf_counter()
+            results = fn(batch) if batch_size else [fn(batch[0])]
+            timer.add(name, time.perf_counter() - t0, len(batch))
+            for result in results:
+                for out_q in out_qs:
+                    out_q.put(result)
+    except Exception as e:
+        print(f"Error di stage {name}: {e}")
+        stop.set()
+        while not ended:
+            ended = in_q.get() is _END
+    finally:
+        for out_q in out_qs:
+            out_q.put(_END)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Deteksi & tracking UAV (YOLO + ByteTrack).")
+    parser.add_argument("--model", default=MODEL_PATH, help="Path bobot YOLO (.pt).")
+    parser.add_argument("--source", default=VIDEO_SOURCE, help="Path video input.")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Video hasil anotasi (mode normal).")
+    parser.add_argument("--conf", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=IOU_THRESHOLD)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Jumlah frame per forward pass YOLO (untuk video offline; 1 = per frame).")
+    parser.add_argument("--headless", action="store_true",
+                        help="Tanpa anotasi, cv2.imshow, maupun encode video; hanya tracking.")
+    parser.add_argument("--tracks", default=None,
+                        help="Tulis record track per frame ke file .jsonl atau .csv.")
+    parser.add_argument("--snapshot-every", type=int, default=0,
+                        help="Simpan frame beranotasi (JPEG) setiap N frame. 0 = nonaktif.")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size minimal 1")
+    return args
+
 def main():
+    args = parse_args()
+    if args.headless and not args.tracks and not args.snapshot_every:
+        print("Peringatan: mode headless tanpa --tracks / --snapshot-every tidak menghasilkan output.")
+
     # 1. Load Model
     try:
-        print(f"Memuat model dari: {MODEL_PATH}")
-        model = YOLO(MODEL_PATH)
+        print(f"Memuat model dari: {args.model}")
+        model = YOLO(args.model)
     except Exception as e:
         print(f"Error memuat model: {e}")
         return
@@ -30,85 +186,166 @@ def main():
     # 3. Inisialisasi Visualisasi (BERSIH)
     # HANYA Kotak dan Label. TIDAK ADA Trace/Garis.
     box_annotator = sv.BoxAnnotator(
-        thickness=2, 
+        thickness=2,
         color_lookup=sv.ColorLookup.TRACK
     )
-    
+
     label_annotator = sv.LabelAnnotator(
-        text_scale=0.5, 
-        text_thickness=1, 
+        text_scale=0.5,
+        text_thickness=1,
         color_lookup=sv.ColorLookup.TRACK,
         text_position=sv.Position.TOP_CENTER
     )
 
     # 4. Setup Video
-    cap = cv2.VideoCapture(VIDEO_SOURCE)
+    cap = cv2.VideoCapture(args.source)
     if not cap.isOpened():
-        print(f"Error: Tidak bisa membuka video {VIDEO_SOURCE}")
+        print(f"Error: Tidak bisa membuka video {args.source}")
         return
 
     w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS))
-    
-    # Setup Writer
-    out = cv2.VideoWriter(OUTPUT_PATH, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
-
-    print("Mulai Tracking Bersih (YOLO + ByteTrack). Tekan 'q' untuk keluar.")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Video selesai.")
-            break
-
-        # =======================================================
-        # 1. DETEKSI (YOLO)
-        # =======================================================
-        results = model(frame, conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD, verbose=False)[0]
-        
-        # Konversi ke format Supervision
-        detections = sv.Detections.from_ultralytics(results)
-
-        # =======================================================
-        # 2. TRACKING (BYTETRACK)
-        # =======================================================
-        # Update tracker dengan deteksi baru
-        detections = byte_tracker.update_with_detections(detections)
 
-        # =======================================================
-        # 3. VISUALISASI
-        # =======================================================
+    # Setup Writer (mode headless: tidak ada encode video sama sekali)
+    out = None
+    if not args.headless:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        out = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+
+    track_writer = TrackWriter(args.tracks, model.names) if args.tracks else None
+    if args.snapshot_every:
+        os.makedirs(args.snapshot_dir, exist_ok=True)
+
+    # =======================================================
+    # STAGE PIPELINE
+    # decode (thread) -> inference -> tracking[+anotasi] -> output (thread: track / video / snapshot)
+    #                                                   \-> tampilan (main thread, bukan headless)
+    # =======================================================
+    def detect(batch):
+        # 1. DETEKSI (YOLO) -- satu forward pass untuk seluruh batch frame
+        frames = [frame for _, frame in batch]
+        results = model(frames, conf=args.conf, iou=args.iou, verbose=False)
+        # Konversi ke format Supervision (urutan hasil = urutan frame)
+        return [(index, frame, sv.Detections.from_ultralytics(r)) for (index, frame), r in zip(batch, results)]
+
+    def annotate(frame, detections):
         annotated_frame = frame.copy()
-        
+
         # Gambar Kotak
         annotated_frame = box_annotator.annotate(
-            scene=annotated_frame, 
+            scene=annotated_frame,
             detections=detections
         )
-        
+
         # Gambar Label (Isi: Tracker ID + Class Name + Confidence)
         labels = []
         for tracker_id, class_id, confidence in zip(detections.tracker_id, detections.class_id, detections.confidence):
             class_name = model.names[class_id]
             labels.append(f"#{tracker_id} {class_name} {confidence:.2f}")
 
-        annotated_frame = label_annotator.annotate(
-            scene=annotated_frame, 
-            detections=detections, 
+        return label_annotator.annotate(
+            scene=annotated_frame,
+            detections=detections,
             labels=labels
         )
 
-        # Tampilkan
-        cv2.imshow("Clean UAV Tracking", annotated_frame)
-        out.write(annotated_frame)
+    def track(item):
+        index, frame, detections = item
+
+        # 2. TRACKING (BYTETRACK)
+        # Update tracker dengan deteksi baru (harus berurutan per frame)
+        detections = byte_tracker.update_with_detections(detections)
+
+        # 3. VISUALISASI (dilewati di mode headless)
+        annotated_frame = None if args.headless else annotate(frame, detections)
+        return index, frame, detections, annotated_frame
+
+    timer = StageTimer()
+    stop = threading.Event()
+    # Antrean decode minimal satu batch penuh agar decode bisa mengisi batch berikutnya
+    frame_q = queue.Queue(maxsize=max(QUEUE_SIZE, 2 * args.batch_size))
+    detection_q = queue.Queue(maxsize=QUEUE_SIZE)
+    output_q = queue.Queue(maxsize=QUEUE_SIZE)
+    display_q = queue.Queue(maxsize=QUEUE_SIZE)
+
+    progress = {"frames": 0, "window_start": 0.0}
+
+    def write_outputs(item):
+        index, frame, detections, annotated_frame = item
+        if track_writer is not None:
+            track_writer.write(index, detections)
+        if out is not None:
+            out.write(annotated_frame)
+        if args.snapshot_every and index % args.snapshot_every == 0:
+            # Anotasi ringan hanya untuk frame snapshot (mode headless)
+            snapshot = annotated_frame if annotated_frame is not None else annotate(frame, detections)
+            cv2.imwrite(os.path.join(args.snapshot_dir, f"frame_{index:06d}.jpg"), snapshot)
+
+        progress["frames"] += 1
+        if progress["frames"] % LOG_EVERY == 0:
+            now = time.perf_counter()
+            print(f"[Pipeline] frame {progress['frames']}: {LOG_EVERY / (now - progress['window_start']):.1f} FPS "
+                  f"(antrean decode={frame_q.qsize()} deteksi={detection_q.qsize()} output={output_q.qsize()})")
+            progress["window_start"] = now
+
+    tracking_outputs = [output_q] if args.headless else [output_q, display_q]
+    threads = [
+        threading.Thread(target=decode_frames, args=(cap, frame_q, timer, stop), name="decode"),
+        threading.Thread(target=run_stage, args=("inference", detect, frame_q, [detection_q], timer, stop, args.batch_size), name="inference"),
+        threading.Thread(target=run_stage, args=("tracking", track, detection_q, tracking_outputs, timer, stop), name="tracking"),
+        threading.Thread(target=run_stage, args=("output", write_outputs, output_q, [], timer, stop), name="output"),
+    ]
+
+    if args.headless:
+        print("Mulai Tracking Headless (YOLO + ByteTrack). Tekan Ctrl+C untuk berhenti.")
+    else:
+        print("Mulai Tracking Bersih (YOLO + ByteTrack). Tekan 'q' untuk keluar.")
+    if args.batch_size > 1:
+        print(f"Inference batch: {args.batch_size} frame per forward pass.")
+    start = progress["window_start"] = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    display_done = args.headless
+    try:
+        if not args.headless:
+            # Tampilan tetap di main thread (GUI OpenCV tidak aman dari thread lain)
+            while True:
+                item = display_q.get()
+                if item is _END:
+                    display_done = True
+                    break
+                if stop.is_set():
+                    continue  # Kuras sisa frame agar stage lain bisa selesai
+
+                t0 = time.perf_counter()
+                cv2.imshow("Clean UAV Tracking", item[3])
+                key = cv2.waitKey(1) & 0xFF
+                timer.add("display", time.perf_counter() - t0)
+
+                if key == ord('q'):
+                    stop.set()
 
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        print("Dihentikan oleh pengguna.")
+        stop.set()
+        while not display_done:
+            display_done = display_q.get() is _END
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - start
 
     cap.release()
-    out.release()
-    cv2.destroyAllWindows()
+    if out is not None:
+        out.release()
+        cv2.destroyAllWindows()
+    if track_writer is not None:
+        track_writer.close()
+        print(f"Record track disimpan ke {args.tracks}")
+    timer.report(progress["frames"], elapsed)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()